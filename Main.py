@@ -1,15 +1,44 @@
 # cell_simulation.py
 
-import pygame
+import argparse
+import gc
+import json
+import hashlib
+import os
+import queue
 import random
 import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields, replace
+from operator import attrgetter
+
+import numpy as np
+
+# NumPy generator for the batched (array) parts of the simulation. Seeded together
+# with the random module by seed_simulation().
+rng = np.random.default_rng()
 
 # Constants
-SCREEN_WIDTH = 1400
+SCREEN_WIDTH = 1400  # Size of the world view in the window (the sidebar comes on top)
 SCREEN_HEIGHT = 900
+WORLD_WIDTH = 1400  # Size of the simulated world, can be much larger than the view
+WORLD_HEIGHT = 900
 CELL_SIZE = 10
-GRID_CELL_SIZE = CELL_SIZE * 3
+GRID_CELL_SIZE = CELL_SIZE * 3  # Initial bucket size of the spatial grid, and the default get_nearby radius
+GRID_ADAPT_INTERVAL = 250  # Ticks between re-checking the bucket size against the cell density (0 disables)
+GRID_BUCKET_SIZES = tuple(range(CELL_SIZE, GRID_CELL_SIZE * 4 + 1, CELL_SIZE))  # Sizes SpatialGrid.adapt picks from
+GRID_BUCKET_COST = 2.0  # Cost of visiting a bucket, relative to looking at one cell in it
+GRID_REBUILD_GAIN = 0.1  # Only rebuild for an estimated saving of at least this much
+# get_nearby calls per cell and tick, as (radius, weight): collision checks, mating, mate search
+GRID_QUERIES = ((0, 2.0), (CELL_SIZE, 1.0), (GRID_CELL_SIZE, 0.1))
 TICK_RATE = 30
+LOD_ZOOM_THRESHOLD = 0.5  # Below this zoom the world is drawn as a density heatmap instead of single cells
+LOD_SATURATION = 4  # Cells/food per grid bucket that show at full brightness in the heatmap
+DEBUG_OVERLAY_LIMIT = 150  # Most cells that get a debug overlay, the ones closest to the cursor win
+TEXT_CACHE_SIZE = 4096  # Most rendered labels the debug overlay keeps
 
 # Game Variables
 NUM_INITIAL_CELLS = 50
@@ -25,6 +54,9 @@ IDLE_HUNGER_CONSUMPTION = 0.1  # Increased from 0.05
 NUM_OBSTACLES = 10
 MAX_OBSTACLE_WIDTH = 100
 MAX_OBSTACLE_HEIGHT = 100
+OBSTACLE_MAP = None  # Image or JSON rectangle list to load the obstacles from; random obstacles when None
+OBSTACLE_INDEX_CELL_SIZE = 64  # Bucket size of the ObstacleMap lookup for off-grid points
+WORLD_CACHE_DIR = ".world_cache"  # Compiled obstacle maps, see load_obstacle_map
 
 # Graph data
 live_cells_history = []
@@ -34,12 +66,13 @@ ticks = []
 mating_attempts = 0
 mating_successes = 0
 food_despawned_count = 0
+next_cell_id = 0
 
 # Mating Data
 MATING_STAMINA_COST = 90  # Reduced from 120
 MATING_HUNGER_COST = 30   # Reduced from 50
 MATING_COOLDOWN = 400     # Reduced from 600
-MATING_DURATION = 240
+MATING_DURATION = 60       # Ticks. Was 240, but the timer used to be counted down four times per tick
 NEWBORN_MATING_COOLDOWN = 100  # Reduced from 200
 
 # Cell stats
@@ -52,10 +85,53 @@ CELL_INITIAL_HUNGER = 120
 MAX_AGE = 1400
 INITIAL_MORTALITY_CHANCE = 0.00001  # Reduced from 0.0001
 
+# Behaviour goals. Cells remember their goal and target between ticks.
+GOAL_NONE = 0
+GOAL_FOOD = 1
+GOAL_MATE = 2
+GOAL_WANDER = 3
+GOAL_REFRESH_TICKS = 10  # Re-run the nearest-target search at least this often
+
+# Decision scheduling. With a period above 1 a cell only searches for a new target
+# on every DECISION_PERIOD-th tick, see DecisionScheduler.
+DECISION_PERIOD = 1
+DECISION_PERIOD_MAX = 32
+DECISION_RELAX_THRESHOLD = 0.5  # Shorten the period again once ticks average below this share of the budget
+DECISION_RELAX_TICKS = 30  # Ticks to wait after a change before shortening the period
+DECISION_SETTLE_TICKS = 10  # Ticks to wait after a change before judging it or raising again
+DECISION_MIN_GAIN = 0.1  # A longer period has to cut the average tick by this share, or it is undone
+
+# Early stopping of headless runs, see TerminationCriteria
+STEADY_STATE_WINDOW = 500  # Ticks per window when comparing rolling statistics
+STEADY_STATE_TOLERANCE = 0.05  # Largest change of mean and spread between windows, relative to the mean
+
+# Movement. "sequential" moves the cells one after another in list order (each
+# sees the moves before it), "simultaneous" moves them all at once, see move_cells.
+MOVEMENTS = ("sequential", "simultaneous")
+MOVEMENT = "sequential"
+MOVEMENT_BACKENDS = ("numpy", "numba")
+# How plan_moves and claim_slots run. "numba" compiles their per-cell loops with Numba
+# (optional): the same results, 5-8x faster movement planning, but only ~10% off a whole
+# tick, since goal and target selection stay per-cell Python
+MOVEMENT_BACKEND = "numpy"
+
+# Genetics
+GENOME_SIZE = 8  # Genes per cell. Genes without a trait drift freely.
+VISION_RANGE = 400  # Base distance a cell can see food and mates from
+
+# Lineage
+LINEAGE_PRUNE_INTERVAL = 1000  # Ticks between dropping lineages that have died out
+
 # Food limits
 MAX_FOOD_CELLS = 300
 MIN_FOOD_CELLS = 50
 FOOD_DESPAWN_TIME = 2000  # Food will despawn after 2000 ticks if not eaten
+FOOD_RESPAWN_RATE_MAX = 50.0  # Highest rate the hotkeys go to, in food per tick
+FOOD_DISTRIBUTIONS = ("gaussian", "uniform", "patches")
+FOOD_DISTRIBUTION = "gaussian"  # Where new food spawns, see FoodSpawner
+FOOD_PATCH_COUNT = 5  # Hotspots for the "patches" distribution
+FOOD_PATCH_RADIUS = 60  # Standard deviation of a hotspot
+food_patches = np.zeros((0, 2))  # Hotspot centres of the current world, see random_food_patches
 
 # Colors
 WHITE = (255, 255, 255)
@@ -70,22 +146,158 @@ HOT_PINK = (255, 0, 166)
 GRAY = (110, 110, 110)
 YELLOW = (255, 255, 102)
 
+# Config
+#
+# The gameplay parameters above can be overridden from a JSON or TOML file
+# (--config). apply_config() writes them back into the module globals, which
+# only happens between ticks, so the simulation code keeps reading plain globals.
+# The per-cell paths (step_simulation's loop, Cell.move_towards, Cell.move_randomly)
+# copy the ones they read over and over into locals, as they are constant for the tick.
+
+CONFIG_CHECK_INTERVAL = 30  # Ticks between checking the config file for changes
+
+
+@dataclass
+class SimulationConfig:
+    """Tunable simulation parameters. Field names are the lower case module globals."""
+
+    num_initial_cells: int = NUM_INITIAL_CELLS
+    num_initial_food: int = NUM_INITIAL_FOOD
+    num_obstacles: int = NUM_OBSTACLES
+    food_respawn_rate: float = FOOD_RESPAWN_RATE
+    min_food_cells: int = MIN_FOOD_CELLS
+    max_food_cells: int = MAX_FOOD_CELLS
+    food_despawn_time: int = FOOD_DESPAWN_TIME
+    stamina_per_step: float = STAMINA_PER_STEP
+    food_gained_from_food_cells: float = FOOD_GAINED_FROM_FOOD_CELLS
+    stamina_gained_from_food_cells: float = STAMINA_GAINED_FROM_FOOD_CELLS
+    idle_stamina_gain: float = IDLE_STAMINA_GAIN
+    idle_hunger_consumption: float = IDLE_HUNGER_CONSUMPTION
+    mating_stamina_cost: float = MATING_STAMINA_COST
+    mating_hunger_cost: float = MATING_HUNGER_COST
+    mating_cooldown: int = MATING_COOLDOWN
+    mating_duration: int = MATING_DURATION
+    newborn_mating_cooldown: int = NEWBORN_MATING_COOLDOWN
+    max_age: int = MAX_AGE
+    initial_mortality_chance: float = INITIAL_MORTALITY_CHANCE
+    goal_refresh_ticks: int = GOAL_REFRESH_TICKS
+    food_distribution: str = FOOD_DISTRIBUTION
+    movement: str = MOVEMENT
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if field.type is float and isinstance(value, int) and not isinstance(value, bool):
+                value = float(value)
+                setattr(self, field.name, value)
+            if type(value) is not field.type:
+                raise ValueError(f"Config value {field.name} must be {field.type.__name__}, got {value!r}")
+        if self.food_distribution not in FOOD_DISTRIBUTIONS:
+            raise ValueError(f"food_distribution must be one of {', '.join(FOOD_DISTRIBUTIONS)}")
+        if self.movement not in MOVEMENTS:
+            raise ValueError(f"movement must be one of {', '.join(MOVEMENTS)}")
+
+    @classmethod
+    def current(cls):
+        """The config the simulation is running with right now."""
+        return cls(**{field.name: globals()[field.name.upper()] for field in fields(cls)})
+
+
+def load_config(path):
+    """Read a SimulationConfig from a .json or .toml file. Missing keys keep their defaults."""
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML config files need Python 3.11 or newer, use JSON instead")
+        with open(path, "rb") as f:
+            values = tomllib.load(f)
+    else:
+        with open(path) as f:
+            values = json.load(f)
+    unknown = set(values) - {field.name for field in fields(SimulationConfig)}
+    if unknown:
+        raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+    return SimulationConfig(**values)
+
+
+def apply_config(config):
+    """Make config the running configuration."""
+    for name, value in asdict(config).items():
+        globals()[name.upper()] = value
+
+
+class ConfigWatcher:
+    """Reloads a config file when it changes on disk.
+
+    poll() is called between ticks and returns a "set_config" input event holding
+    the changed values, so the change is applied (and recorded) like any other input.
+    """
+
+    def __init__(self, path, check_interval=CONFIG_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self.mtime = os.stat(path).st_mtime
+        self.config = load_config(path)
+
+    def poll(self, current_tick):
+        if current_tick % self.check_interval != 0:
+            return None
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self.mtime:
+                return None
+            self.mtime = mtime
+            config = load_config(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Could not reload config {self.path}: {e}")
+            return None
+        old, new = asdict(self.config), asdict(config)
+        self.config = config
+        changed = {name: value for name, value in new.items() if old[name] != value}
+        if not changed:
+            return None
+        return {"kind": "set_config", "values": changed}
+
+
+BY_ID = attrgetter("id")  # Sort key that puts cells in a fixed order
+
+
 class SpatialGrid:
     def __init__(self, width, height, cell_size):
+        self.world_size = (width, height)
         self.cell_size = cell_size
         self.width = width // cell_size + 1
         self.height = height // cell_size + 1
         self.grid = [[[] for _ in range(self.height)] for _ in range(self.width)]
+        # Bucket sizes, kept up to date alongside the buckets so the heatmap can
+        # read them every frame without walking the grid
+        self.occupancy = np.zeros((self.width, self.height), dtype=np.int64)
 
     def add(self, cell):
         x_idx = int(cell.x // self.cell_size)
         y_idx = int(cell.y // self.cell_size)
         self.grid[x_idx][y_idx].append(cell)
+        self.occupancy[x_idx, y_idx] += 1
+
+    def add_many(self, cells):
+        grid = self.grid
+        cell_size = self.cell_size
+        x_indices = []
+        y_indices = []
+        for cell in cells:
+            x_idx = int(cell.x // cell_size)
+            y_idx = int(cell.y // cell_size)
+            grid[x_idx][y_idx].append(cell)
+            x_indices.append(x_idx)
+            y_indices.append(y_idx)
+        np.add.at(self.occupancy, (x_indices, y_indices), 1)
 
     def remove(self, cell):
         x_idx = int(cell.x // self.cell_size)
         y_idx = int(cell.y // self.cell_size)
         self.grid[x_idx][y_idx].remove(cell)
+        self.occupancy[x_idx, y_idx] -= 1
 
     def move(self, cell, old_x, old_y):
         old_x_idx = int(old_x // self.cell_size)
@@ -95,18 +307,201 @@ class SpatialGrid:
         if old_x_idx != new_x_idx or old_y_idx != new_y_idx:
             self.grid[old_x_idx][old_y_idx].remove(cell)
             self.grid[new_x_idx][new_y_idx].append(cell)
+            occupancy = self.occupancy
+            occupancy[old_x_idx, old_y_idx] -= 1
+            occupancy[new_x_idx, new_y_idx] += 1
 
-    def get_nearby(self, x, y):
-        x_idx = int(x // self.cell_size)
-        y_idx = int(y // self.cell_size)
+    def counts(self):
+        """Number of cells in every bucket, as a (width, height) array.
+
+        This is the grid's own raster, not a copy: read it, don't change it.
+        """
+        return self.occupancy
+
+    def get_in_rect(self, x0, y0, x1, y1):
+        """All cells in the buckets overlapping the rectangle (may include a few just outside it)."""
         cells = []
-        for i in range(max(0, x_idx-1), min(self.width, x_idx+2)):
-            for j in range(max(0, y_idx-1), min(self.height, y_idx+2)):
-                cells.extend(self.grid[i][j])
+        for i in range(max(0, int(x0 // self.cell_size)), min(self.width, int(x1 // self.cell_size) + 1)):
+            column = self.grid[i]
+            for j in range(max(0, int(y0 // self.cell_size)), min(self.height, int(y1 // self.cell_size) + 1)):
+                cells.extend(column[j])
         return cells
 
+    def get_nearby(self, x, y, radius=GRID_CELL_SIZE):
+        """Cells at most radius away from (x, y) on both axes, in id order.
+
+        Neither the cells nor their order depend on the bucket size, so adapt()
+        doesn't change what cells find.
+        """
+        nearby = [cell for cell in self.get_in_rect(x - radius, y - radius, x + radius, y + radius)
+                  if -radius <= cell.x - x <= radius and -radius <= cell.y - y <= radius]
+        if len(nearby) > 1:
+            nearby.sort(key=BY_ID)
+        return nearby
+
+    def rebuild(self, cell_size):
+        """Switch to buckets of cell_size, keeping the cells in their current order."""
+        cells = [cell for column in self.grid for bucket in column for cell in bucket]
+        self.__init__(*self.world_size, cell_size)
+        self.add_many(cells)
+
+    def query_cost(self, cell_size, density):
+        """Estimated cost of the get_nearby calls of a tick with buckets of cell_size.
+
+        density is the number of cells per square pixel around the average cell.
+        Each query visits about (2 * radius / cell_size + 1) ** 2 buckets and the
+        cells on an area of (2 * radius + cell_size) ** 2.
+        """
+        cost = 0.0
+        for radius, weight in GRID_QUERIES:
+            span = 2 * radius / cell_size + 1
+            cost += weight * (GRID_BUCKET_COST * span ** 2 + density * (2 * radius + cell_size) ** 2)
+        return cost
+
+    def adapt(self):
+        """Rebuild at the bucket size with the lowest query_cost, if that saves at least
+        GRID_REBUILD_GAIN. Returns True if the grid was rebuilt."""
+        counts = self.counts()
+        total = counts.sum()
+        if total == 0:
+            return False
+        # Cells sharing a bucket with the average cell, spread over the bucket
+        density = (counts ** 2).sum() / total / self.cell_size ** 2
+        best = min(GRID_BUCKET_SIZES, key=lambda size: self.query_cost(size, density))
+        if best == self.cell_size:
+            return False
+        if self.query_cost(best, density) > self.query_cost(self.cell_size, density) * (1 - GRID_REBUILD_GAIN):
+            return False
+        self.rebuild(best)
+        return True
+
+class Trait:
+    """A phenotype parameter expressed from a single gene.
+
+    value = base + scale * gene, rounded for integer traits. Children get the
+    floored average of their parents' genes plus a random integer in
+    [-mutation, mutation], clipped so the value stays within [minimum, maximum];
+    the clipped gene is what they pass on. Founder genes are not clipped.
+    """
+    __slots__ = ("name", "gene", "base", "scale", "minimum", "maximum", "mutation", "integer")
+
+    def __init__(self, name, gene, base=0, scale=1, minimum=-np.inf, maximum=np.inf, mutation=1, integer=False):
+        self.name = name
+        self.gene = gene
+        self.base = base
+        self.scale = scale
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mutation = mutation
+        self.integer = integer
+
+
+# Trait registry. Adding a trait here adds the matching Cell attribute, its
+# inheritance and its checkpointing; expression is done in bulk at birth.
+TRAITS = (
+    Trait("speed", gene=0, minimum=1, mutation=1, integer=True),
+    Trait("max_hp", gene=1, minimum=10, mutation=2, integer=True),
+    Trait("max_stamina", gene=2, minimum=10, mutation=2, integer=True),
+    Trait("max_hunger", gene=3, minimum=10, mutation=2, integer=True),
+    Trait("vision_range", gene=4, base=VISION_RANGE, scale=20, minimum=CELL_SIZE * 5),
+    Trait("metabolic_rate", gene=5, base=1.0, scale=0.05, minimum=0.5, maximum=2.0),
+)
+TRAIT_NAMES = tuple(trait.name for trait in TRAITS)
+LINEAGE_TRAITS = TRAIT_NAMES
+
+_TRAIT_GENES = np.array([trait.gene for trait in TRAITS])
+_TRAIT_BASE = np.array([trait.base for trait in TRAITS], dtype=np.float64)
+_TRAIT_SCALE = np.array([trait.scale for trait in TRAITS], dtype=np.float64)
+_TRAIT_MIN = np.array([trait.minimum for trait in TRAITS], dtype=np.float64)
+_TRAIT_MAX = np.array([trait.maximum for trait in TRAITS], dtype=np.float64)
+_GENE_MUTATION = np.ones(GENOME_SIZE, dtype=np.int64)
+_GENE_MUTATION[_TRAIT_GENES] = [trait.mutation for trait in TRAITS]
+# Range of genes whose value is within the trait's bounds (the rounding
+# keeps e.g. (0.5 - 1.0) / 0.05 from landing just past -10)
+_GENE_MIN = np.full(GENOME_SIZE, np.iinfo(np.int32).min, dtype=np.int64)
+_GENE_MAX = np.full(GENOME_SIZE, np.iinfo(np.int32).max, dtype=np.int64)
+_GENE_MIN[_TRAIT_GENES] = np.maximum(np.ceil(np.round((_TRAIT_MIN - _TRAIT_BASE) / _TRAIT_SCALE, 9)),
+                                     _GENE_MIN[_TRAIT_GENES])
+_GENE_MAX[_TRAIT_GENES] = np.minimum(np.floor(np.round((_TRAIT_MAX - _TRAIT_BASE) / _TRAIT_SCALE, 9)),
+                                     _GENE_MAX[_TRAIT_GENES])
+
+
+def pack_genomes(genomes):
+    """Turn a (cells, GENOME_SIZE) matrix into one compact bytes object per cell."""
+    data = np.ascontiguousarray(genomes, dtype=np.int32).tobytes()
+    stride = GENOME_SIZE * 4
+    return [data[i:i + stride] for i in range(0, len(data), stride)]
+
+
+def unpack_genomes(packed):
+    """Stack packed genomes back into a (cells, GENOME_SIZE) int32 matrix."""
+    return np.frombuffer(b"".join(packed), dtype=np.int32).reshape(len(packed), GENOME_SIZE)
+
+
+def founder_genomes(count):
+    """Random genomes for cells that have no parents."""
+    return rng.integers(-1, 2, size=(count, GENOME_SIZE), dtype=np.int32)
+
+
+def inherit_genomes(genomes_a, genomes_b):
+    """Blend crossover plus mutation for every child at once (one row per child),
+    clipped to the trait bounds like the max(10, ...) of the original rules."""
+    mutation = rng.integers(-_GENE_MUTATION, _GENE_MUTATION + 1, size=genomes_a.shape)
+    return np.clip((genomes_a + genomes_b) // 2 + mutation, _GENE_MIN, _GENE_MAX).astype(np.int32)
+
+
+def express_genomes(genomes):
+    """Phenotype of each genome row as a (cells, traits) float array."""
+    return _TRAIT_BASE + _TRAIT_SCALE * genomes[:, _TRAIT_GENES]
+
+
+def phenotype_columns(genomes):
+    """express_genomes() as one list of plain Python values per trait."""
+    values = express_genomes(genomes)
+    return [np.rint(values[:, i]).astype(np.int64).tolist() if trait.integer else values[:, i].tolist()
+            for i, trait in enumerate(TRAITS)]
+
+
+def phenotype_rows(genomes):
+    """express_genomes() as rows of plain Python values, ready to assign to cells."""
+    return list(zip(*phenotype_columns(genomes)))
+
+
+@contextmanager
+def gc_paused():
+    """Keep the cyclic garbage collector out of a bulk allocation.
+
+    Creating hundreds of thousands of objects otherwise sets off collections
+    that scan all of them again and again, which costs more than creating them.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
 class Cell:
-    def __init__(self, x, y, generation=0):
+    # Slots instead of a per-instance __dict__: about 13% less memory per cell
+    # (434 vs 498 bytes, see benchmark.py memory; the genome and the floats take
+    # most of it) and slightly faster attribute access in the tick loop.
+    __slots__ = (
+        "id", "hp", "hunger", "stamina", "x", "y",
+        "mating_cooldown", "mating_timer", "is_mating", "partner",
+        "age", "mortality_chance", "is_dead", "generation",
+        "direction_x", "direction_y", "genome",
+        "goal", "target", "goal_age",
+    ) + TRAIT_NAMES
+
+    def __init__(self, x, y, generation=0, genome=None, phenotype=None):
+        """Create a cell. genome is a packed genome (see pack_genomes); without one the
+        cell gets a random founder genome. phenotype (a row from phenotype_rows)
+        skips expressing the genome again."""
+        global next_cell_id
+        self.id = next_cell_id  # Stable id, unique for the whole run
+        next_cell_id += 1
         self.hp = min(CELL_INITIAL_HP, MAX_HP)
         self.hunger = min(CELL_INITIAL_HUNGER, MAX_HUNGER)
         self.stamina = min(CELL_INITIAL_STAMINA, MAX_STAMINA)
@@ -115,24 +510,61 @@ class Cell:
         self.mating_cooldown = NEWBORN_MATING_COOLDOWN
         self.mating_timer = 0
         self.is_mating = False
+        self.partner = None  # The cell this one is mating with
         self.age = 0
         self.mortality_chance = INITIAL_MORTALITY_CHANCE
         self.is_dead = False
         self.generation = generation
-        self.speed = random.randint(-1, 1)
-        self.max_hp = random.randint(-1, 1)
-        self.max_stamina = random.randint(-1, 1)
-        self.max_hunger = random.randint(-1, 1)
+        if genome is None:
+            genome = pack_genomes(founder_genomes(1))[0]
+        # Stored as bytes: a fraction of the memory of a per-cell array, and
+        # unpack_genomes() stacks many of them into a matrix in one call
+        self.genome = genome
+        if phenotype is None:
+            phenotype = phenotype_rows(unpack_genomes([genome]))[0]
+        for name, value in zip(TRAIT_NAMES, phenotype):
+            setattr(self, name, value)
         self.direction_x = 0  # Initialize to zero
         self.direction_y = 0  # Initialize to zero
+        # Cached behaviour decision, see current_target
+        self.goal = GOAL_NONE
+        self.target = None
+        self.goal_age = 0
+
+    @classmethod
+    def from_columns(cls, columns, genomes):
+        """Many cells at once from checkpoint columns ({field: list}, see capture_state)
+        and their genome matrix, without going through __init__. Targets and
+        partners are left None.
+
+        Each row is unpacked straight into the slots, several times faster than
+        setting the attributes one at a time; traits are set one column at a time.
+        """
+        new = cls.__new__
+        cells = []
+        append = cells.append
+        # Same order as CELL_FLOAT_FIELDS + CELL_INT_FIELDS + CELL_BOOL_FIELDS
+        for row in zip(*(columns[field] for field in CELL_FLOAT_FIELDS + CELL_INT_FIELDS + CELL_BOOL_FIELDS),
+                       pack_genomes(genomes)):
+            cell = new(cls)
+            (cell.hp, cell.hunger, cell.stamina, cell.x, cell.y, cell.mortality_chance,
+             cell.direction_x, cell.direction_y,
+             cell.id, cell.mating_cooldown, cell.mating_timer, cell.age, cell.generation, cell.goal, cell.goal_age,
+             cell.is_mating, cell.is_dead, cell.genome) = row
+            cell.target = cell.partner = None
+            append(cell)
+        for name, values in zip(TRAIT_NAMES, phenotype_columns(genomes)):
+            deque(map(getattr(cls, name).__set__, cells, values), maxlen=0)
+        return cells
 
     def move_towards(self, target_x, target_y, spatial_grid, obstacles):
         if self.stamina > 0:
+            cell_size, world_width, world_height = CELL_SIZE, WORLD_WIDTH, WORLD_HEIGHT  # Locals for the hot path
             self.stamina -= STAMINA_PER_STEP * calculate_energy_multiplier(self)  # Apply multiplier
             direction_x = target_x - self.x
             direction_y = target_y - self.y
             distance_to_target = (direction_x ** 2 + direction_y ** 2) ** 0.5
-            step_size = CELL_SIZE * (self.speed if self.speed > 0 else 1)
+            step_size = cell_size * (self.speed if self.speed > 0 else 1)
             if distance_to_target < step_size:
                 step_size = distance_to_target
             if distance_to_target > 0:
@@ -146,12 +578,12 @@ class Cell:
             new_y = self.y + direction_y * step_size
             
             # Improved boundary clamping to ensure grid alignment
-            new_x = max(0, min(new_x, SCREEN_WIDTH - CELL_SIZE))
-            new_y = max(0, min(new_y, SCREEN_HEIGHT - CELL_SIZE))
+            new_x = max(0, min(new_x, world_width - cell_size))
+            new_y = max(0, min(new_y, world_height - cell_size))
             
             # Ensure grid alignment
-            new_x = (new_x // CELL_SIZE) * CELL_SIZE
-            new_y = (new_y // CELL_SIZE) * CELL_SIZE
+            new_x = (new_x // cell_size) * cell_size
+            new_y = (new_y // cell_size) * cell_size
             
             if not self.is_collision(new_x, new_y, spatial_grid, obstacles):
                 self.x, self.y = new_x, new_y
@@ -163,60 +595,102 @@ class Cell:
     def move(self, food_cells, spatial_grid, obstacles):
         if self.is_mating:
             return
+        if self.stamina < 0:
+            self.rest()
+            return
         if self.hunger <= 0:
             self.hp -= 0.25  # Reduced from 0.5 - less HP loss when starving
         if self.hunger >= 90:
             self.hp += 1
-        if self.stamina >= 0:
-            # Priority 1: If very hungry, seek food
-            if self.hunger <= 60:
-                nearest_food = self.find_nearest(food_cells)
-                if nearest_food:
-                    self.move_towards(nearest_food.x, nearest_food.y, spatial_grid, obstacles)
-                else:
-                    # No food available, move randomly
-                    self.move_randomly(spatial_grid, obstacles)
-            # Priority 2: If well-fed and healthy, seek mates
-            elif (self.hunger >= 70 and self.hunger <= 95 and 
-                  self.hp >= 70 and self.hp <= 98 and 
-                  self.stamina >= 50 and 
-                  self.mating_cooldown == 0):
-                global mating_attempts
-                mating_attempts += 1
-                if mating_attempts % 10 == 0:  # Only print every 10th attempt to avoid spam
-                    print(f"Cell looking for mate (attempt #{mating_attempts}) - Hunger: {self.hunger:.1f}, HP: {self.hp:.1f}, Stamina: {self.stamina:.1f}")
-                nearest_mate = self.find_nearest_mate(spatial_grid.get_nearby(self.x, self.y))
-                if nearest_mate:
-                    self.move_towards(nearest_mate.x, nearest_mate.y, spatial_grid, obstacles)
-                else:
-                    # No mates available, move randomly
-                    self.move_randomly(spatial_grid, obstacles)
-            # Priority 3: If moderately fed but not well-fed enough to mate, seek more food
-            elif self.hunger < 70:
-                nearest_food = self.find_nearest(food_cells)
-                if nearest_food:
-                    self.move_towards(nearest_food.x, nearest_food.y, spatial_grid, obstacles)
-                else:
-                    # No food available, move randomly
-                    self.move_randomly(spatial_grid, obstacles)
-            # Priority 4: If overfed or otherwise not meeting mating conditions, move randomly
-            else:
-                self.move_randomly(spatial_grid, obstacles)
-            self.stamina -= STAMINA_PER_STEP
+        goal = self.choose_goal()
+        if goal == GOAL_MATE:
+            global mating_attempts
+            mating_attempts += 1
+            if mating_attempts % 10 == 0:  # Only print every 10th attempt to avoid spam
+                print(f"Cell looking for mate (attempt #{mating_attempts}) - Hunger: {self.hunger:.1f}, HP: {self.hp:.1f}, Stamina: {self.stamina:.1f}")
+        target = self.current_target(goal, food_cells, spatial_grid)
+        if target:
+            self.move_towards(target.x, target.y, spatial_grid, obstacles)
+        else:
+            # Nothing to go for (or nothing in sight), move randomly
+            self.move_randomly(spatial_grid, obstacles)
+        self.stamina -= STAMINA_PER_STEP
+
+    def rest(self):
+        """The turn of a cell that is out of stamina: it stays put and recovers."""
+        if self.hunger <= 0:
+            self.hp -= 0.25
+        if self.hunger >= 90:
+            self.hp += 1
+        self.stamina = min(self.stamina + IDLE_STAMINA_GAIN, MAX_STAMINA)
+
+    def choose_goal(self):
+        """Pick the branch of the behaviour cascade. Only cheap threshold checks."""
+        # Priority 1: If very hungry, seek food
+        if self.hunger <= 60:
+            return GOAL_FOOD
+        # Priority 2: If well-fed and healthy, seek mates
+        if self.is_mate_candidate():
+            return GOAL_MATE
+        # Priority 3: If moderately fed but not well-fed enough to mate, seek more food
+        if self.hunger < 70:
+            return GOAL_FOOD
+        # Priority 4: If overfed or otherwise not meeting mating conditions, move randomly
+        return GOAL_WANDER
+
+    def current_target(self, goal, food_cells, spatial_grid):
+        """Return the food or mate to move towards for goal (None if there is none).
+
+        The previous decision is reused while the goal is unchanged, its target is
+        still valid and it is less than GOAL_REFRESH_TICKS old, so the nearest-target
+        searches only run when something relevant changed.
+        """
+        if goal == GOAL_WANDER:
+            self.goal = goal
+            self.target = None
+            return None
+        reusable = goal == self.goal and (self.target is None or self.target_is_valid())
+        if reusable and self.goal_age < GOAL_REFRESH_TICKS:
+            self.goal_age += 1
+            return self.target
+        if DECISION_PERIOD > 1 and (self.id + len(ticks)) % DECISION_PERIOD:
+            # Not this cell's turn to search, keep going with what it has
+            self.goal_age += 1
+            return self.target if reusable else None
+        if goal == GOAL_FOOD:
+            target = self.find_nearest(food_cells)
         else:
-            self.stamina = min(self.stamina + IDLE_STAMINA_GAIN, MAX_STAMINA)
+            target = self.find_nearest_mate(spatial_grid.get_nearby(self.x, self.y))
+        self.goal = goal
+        self.target = target
+        self.goal_age = 0
+        return target
+
+    def target_is_valid(self):
+        if self.goal == GOAL_FOOD:
+            return self.target.x != -1  # Eaten and despawned food is marked consumed
+        return self.target.is_mate_candidate()
+
+    def is_mate_candidate(self):
+        # Relaxed mating conditions, used both for seeking and for being sought
+        return (70 <= self.hunger <= 95 and   # Relaxed from 80-95
+                70 <= self.hp <= 98 and       # Relaxed from 80-98
+                self.stamina >= 50 and        # Reduced from 60
+                self.mating_cooldown == 0 and
+                not self.is_mating)
 
     def move_randomly(self, spatial_grid, obstacles):
+        cell_size, world_width, world_height = CELL_SIZE, WORLD_WIDTH, WORLD_HEIGHT  # Locals for the hot path
         if self.stamina > 0:
             self.stamina -= STAMINA_PER_STEP * calculate_energy_multiplier(self)  # Apply multiplier
         
         # Check if cell is near edge and add bias to move away
-        near_edge = (self.x < CELL_SIZE * 2 or self.x > SCREEN_WIDTH - CELL_SIZE * 3 or 
-                    self.y < CELL_SIZE * 2 or self.y > SCREEN_HEIGHT - CELL_SIZE * 3)
+        near_edge = (self.x < cell_size * 2 or self.x > world_width - cell_size * 3 or 
+                    self.y < cell_size * 2 or self.y > world_height - cell_size * 3)
         
         if near_edge and random.random() < 0.7:  # 70% chance to move away from edge
             # Calculate direction away from nearest edge
-            center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
+            center_x, center_y = world_width // 2, world_height // 2
             away_x = center_x - self.x
             away_y = center_y - self.y
             # Normalize
@@ -225,11 +699,11 @@ class Cell:
                 away_x /= distance
                 away_y /= distance
                 # Move in the away direction
-                new_x = self.x + away_x * CELL_SIZE
-                new_y = self.y + away_y * CELL_SIZE
+                new_x = self.x + away_x * cell_size
+                new_y = self.y + away_y * cell_size
                 # Ensure grid alignment
-                new_x = (new_x // CELL_SIZE) * CELL_SIZE
-                new_y = (new_y // CELL_SIZE) * CELL_SIZE
+                new_x = (new_x // cell_size) * cell_size
+                new_y = (new_y // cell_size) * cell_size
                 if self.is_within_bounds(new_x, new_y) and not self.is_collision(new_x, new_y, spatial_grid, obstacles):
                     old_x, old_y = self.x, self.y
                     self.x, self.y = new_x, new_y
@@ -243,12 +717,12 @@ class Cell:
         random.shuffle(directions)
         for direction in directions:
             new_x, new_y = self.x, self.y
-            step_size = CELL_SIZE * (self.speed if self.speed > 0 else 1)
+            step_size = cell_size * (self.speed if self.speed > 0 else 1)
             if direction == 'up' and self.y > 0:
                 new_y -= step_size
                 self.direction_x = 0
                 self.direction_y = -1
-            elif direction == 'down' and self.y < SCREEN_HEIGHT - CELL_SIZE:
+            elif direction == 'down' and self.y < world_height - cell_size:
                 new_y += step_size
                 self.direction_x = 0
                 self.direction_y = 1
@@ -256,7 +730,7 @@ class Cell:
                 new_x -= step_size
                 self.direction_x = -1
                 self.direction_y = 0
-            elif direction == 'right' and self.x < SCREEN_WIDTH - CELL_SIZE:
+            elif direction == 'right' and self.x < world_width - cell_size:
                 new_x += step_size
                 self.direction_x = 1
                 self.direction_y = 0
@@ -264,8 +738,8 @@ class Cell:
                 continue  # Skip invalid movement
             
             # Ensure grid alignment
-            new_x = (new_x // CELL_SIZE) * CELL_SIZE
-            new_y = (new_y // CELL_SIZE) * CELL_SIZE
+            new_x = (new_x // cell_size) * cell_size
+            new_y = (new_y // cell_size) * cell_size
             
             if self.is_within_bounds(new_x, new_y) and not self.is_collision(new_x, new_y, spatial_grid, obstacles):
                 old_x, old_y = self.x, self.y
@@ -274,11 +748,11 @@ class Cell:
                 break
 
     def is_within_bounds(self, x, y):
-        return 0 <= x < SCREEN_WIDTH and 0 <= y < SCREEN_HEIGHT
+        return 0 <= x < WORLD_WIDTH and 0 <= y < WORLD_HEIGHT
 
     def find_nearest(self, objects):
         nearest_object = None
-        min_distance = float('inf')
+        min_distance = self.vision_range  # Objects further away than this aren't seen
         for obj in objects:
             if obj.x != -1 and obj.y != -1:
                 distance = math.hypot(self.x - obj.x, self.y - obj.y)
@@ -290,15 +764,9 @@ class Cell:
     def find_nearest_mate(self, cells):
         #print("A cell is looking for mate.")
         nearest_mate = None
-        min_distance = float('inf')
+        min_distance = self.vision_range
         for cell in cells:
-            # Relaxed mating conditions to match move method
-            if (cell != self and 
-                cell.hunger >= 70 and cell.hunger <= 95 and  # Relaxed from 80-95
-                cell.hp >= 70 and cell.hp <= 98 and          # Relaxed from 80-98
-                cell.stamina >= 50 and                       # Reduced from 60
-                cell.mating_cooldown == 0 and 
-                not cell.is_mating):
+            if cell != self and cell.is_mate_candidate():
                 distance = math.hypot(self.x - cell.x, self.y - cell.y)
                 if distance < min_distance:
                     min_distance = distance
@@ -312,105 +780,74 @@ class Cell:
         print(f"SUCCESS! Cell is Mating (success #{mating_successes}). Hunger: {self.hunger:.1f}, HP: {self.hp:.1f}, Stamina: {self.stamina:.1f}")
         self.is_mating = True
         self.mating_timer = MATING_DURATION
+        self.partner = other
         other.is_mating = True
         other.mating_timer = MATING_DURATION
+        other.partner = self
 
-    def mate(self, other, spatial_grid, obstacles):
+    def mate(self, other):
+        """Count down this cell's mating timer, once per tick. Returns True once the
+        pair is done and ready for offspring (whichever partner gets there first)."""
         if self.mating_timer > 0:
             self.mating_timer -= 1
-            other.mating_timer -= 1
-            return []
+            return False
         self.stamina -= MATING_STAMINA_COST
         self.hunger -= MATING_HUNGER_COST
         other.stamina -= MATING_STAMINA_COST
         other.hunger -= MATING_HUNGER_COST
-        offspring = []
-        num_offspring = random.randint(1, 3)
-        for _ in range(num_offspring):
-            for _ in range(10):  # Try up to 10 times to find a valid position
-                new_x = self.x + random.choice([-CELL_SIZE, 0, CELL_SIZE])
-                new_y = self.y + random.choice([-CELL_SIZE, 0, CELL_SIZE])
-                if self.is_within_bounds(new_x, new_y) and not self.is_collision(new_x, new_y, spatial_grid, obstacles):
-                    new_cell = Cell(new_x, new_y, self.generation + 1)
-                    new_cell.mating_cooldown = NEWBORN_MATING_COOLDOWN
-                    # Traits with mutations
-                    new_cell.speed = max(1, (self.speed + other.speed) // 2 + random.randint(-1, 1))
-                    new_cell.max_hp = max(10, (self.max_hp + other.max_hp) // 2 + random.randint(-2, 2))
-                    new_cell.max_stamina = max(10, (self.max_stamina + other.max_stamina) // 2 + random.randint(-2, 2))
-                    new_cell.max_hunger = max(10, (self.max_hunger + other.max_hunger) // 2 + random.randint(-2, 2))
-                    offspring.append(new_cell)
-                    spatial_grid.add(new_cell)
-                    print("A cell has been spawned:" "MAX_HP:" + str(self.max_hp) + " Max Hunger:" + str(
-                        self.max_hunger) + " Max Stam:" + str(self.max_stamina))
-                    break
         self.is_mating = False
         self.mating_cooldown = MATING_COOLDOWN
+        self.partner = None
         other.is_mating = False
         other.mating_cooldown = MATING_COOLDOWN
-        return offspring
+        other.partner = None
+        return True
+
+    def leave_partner(self):
+        """Stop mating without offspring, when the partner died."""
+        self.is_mating = False
+        self.mating_timer = 0
+        self.partner = None
 
     def eat(self, food, food_cells):
         if self.hunger < MAX_HUNGER:
             self.hunger = min(self.hunger + FOOD_GAINED_FROM_FOOD_CELLS, MAX_HUNGER)
             food_cells.remove(food)
+            food.consume()
         elif self.hunger == MAX_HUNGER:
             self.stamina = min(self.stamina + STAMINA_GAINED_FROM_FOOD_CELLS, MAX_STAMINA)
 
-    def update_status(self):
-        self.age += 1
-        
-        # Safety check: ensure cell is within bounds
-        if self.x < 0 or self.x >= SCREEN_WIDTH or self.y < 0 or self.y >= SCREEN_HEIGHT:
-            print(f"WARNING: Cell at ({self.x}, {self.y}) is outside bounds! Clamping...")
-            self.x = max(0, min(self.x, SCREEN_WIDTH - CELL_SIZE))
-            self.y = max(0, min(self.y, SCREEN_HEIGHT - CELL_SIZE))
-            # Ensure grid alignment
-            self.x = (self.x // CELL_SIZE) * CELL_SIZE
-            self.y = (self.y // CELL_SIZE) * CELL_SIZE
-        
-        if self.age > 0.7 * MAX_AGE:
-            self.mortality_chance += 0.00001  # Reduced from 0.0001
-        if random.random() < self.mortality_chance:
-            self.hp = 0
-            print("A cell has died")
-        self.hunger -= 0.8  # Increased from 0.5 - cells need to eat more frequently
-        if self.hunger <= 0:
-            self.hp -= 0.5  # Reduced from 1 - cells lose HP more slowly when starving
-        # Reduced HP gain to prevent immortality
-        if self.hunger >= 100:
-            self.hp += 0.1  # Much smaller HP gain
-        if self.hp > MAX_HP:
-            self.hp = MAX_HP
-        if self.mating_cooldown > 0:
-            self.mating_cooldown -= 1
-        if self.stamina < MAX_STAMINA:
-            self.stamina = min(self.stamina + IDLE_STAMINA_GAIN, MAX_STAMINA)
-        if self.stamina > MAX_STAMINA:
-            self.stamina = MAX_STAMINA
-        if self.hp <= 0:
-            self.is_dead = True
-
     def is_collision(self, x, y, spatial_grid, obstacles):
         # Check obstacle collisions
-        for obstacle in obstacles:
-            if obstacle.is_collision(x, y):
-                return True
+        if obstacles.is_collision(x, y):
+            return True
         # Check cell collisions
-        nearby_cells = spatial_grid.get_nearby(x, y)
+        nearby_cells = spatial_grid.get_nearby(x, y, 0)
         for cell in nearby_cells:
             if cell != self and cell.x == x and cell.y == y:
                 return True
         return False
 
-    def is_adjacent(self, other):
-        return abs(self.x - other.x) <= CELL_SIZE and abs(self.y - other.y) <= CELL_SIZE
-
 class Food:
+    __slots__ = ("x", "y", "spawn_tick")
+
     def __init__(self, x, y, spawn_tick=0):
         self.x = x
         self.y = y
         self.spawn_tick = spawn_tick  # Track when the food was spawned
 
+    @classmethod
+    def from_columns(cls, columns):
+        """Many food items at once from checkpoint columns, like Cell.from_columns."""
+        new = cls.__new__
+        food_cells = []
+        append = food_cells.append
+        for row in zip(columns["x"], columns["y"], columns["spawn_tick"]):
+            food = new(cls)
+            food.x, food.y, food.spawn_tick = row
+            append(food)
+        return food_cells
+
     def consume(self):
         self.x, self.y = -1, -1
         
@@ -419,6 +856,8 @@ class Food:
         return current_tick - self.spawn_tick > FOOD_DESPAWN_TIME
 
 class Obstacle:
+    __slots__ = ("x", "y", "width", "height")
+
     def __init__(self, x, y, width, height):
         self.x = x
         self.y = y
@@ -429,21 +868,323 @@ class Obstacle:
         """Check if a given point collides with the obstacle."""
         return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
 
+    def blocks(self, xs, ys):
+        """Vectorised is_collision for arrays of positions."""
+        return (self.x <= xs) & (xs < self.x + self.width) & (self.y <= ys) & (ys < self.y + self.height)
+
+
+class ObstacleMap(list):
+    """The obstacles of a world, compiled so a collision check costs the same for any number of them.
+
+    Still a list of obstacles (for saving and iterating). Obstacle rectangles
+    are compiled into `walkable`, one entry per CELL_SIZE grid slot, False where
+    the slot's corner lies inside an obstacle. That answers every grid-aligned
+    query, which is all the simulation makes. Any other point is checked exactly
+    against the few obstacles in its OBSTACLE_INDEX_CELL_SIZE bucket. Other
+    entries (like a chunk's Halo) change while the map is in use and are
+    checked as they are.
+
+    `accessible` marks the slots food may be placed on (is_position_accessible).
+    walkable and accessible can be passed in precomputed, see load_obstacle_map.
+    """
+
+    def __init__(self, obstacles=(), walkable=None, accessible=None):
+        super().__init__(obstacles)
+        self.world_size = (WORLD_WIDTH, WORLD_HEIGHT)
+        self.dynamic = [o for o in self if not isinstance(o, Obstacle)]
+        self._index = None
+        if walkable is None:
+            walkable = np.ones((-(-WORLD_WIDTH // CELL_SIZE), -(-WORLD_HEIGHT // CELL_SIZE)), dtype=bool)
+            for obstacle in self:
+                if isinstance(obstacle, Obstacle):
+                    # Slots whose corner is in [x, x + width) x [y, y + height)
+                    i0, i1 = max(-(-obstacle.x // CELL_SIZE), 0), -(-(obstacle.x + obstacle.width) // CELL_SIZE)
+                    j0, j1 = max(-(-obstacle.y // CELL_SIZE), 0), -(-(obstacle.y + obstacle.height) // CELL_SIZE)
+                    walkable[i0:i1, j0:j1] = False
+        self.walkable = walkable
+        if accessible is None:
+            accessible = self._accessible_slots()
+        self.accessible = accessible
+
+    def _accessible_slots(self):
+        """Free slots with a free neighbour inside the border, the rule of is_position_accessible."""
+        columns, rows = self.walkable.shape
+        free = self.walkable
+        open_neighbour = (free & (np.arange(columns)[:, None] * CELL_SIZE < WORLD_WIDTH - CELL_SIZE) &
+                          (np.arange(rows)[None, :] * CELL_SIZE < WORLD_HEIGHT - CELL_SIZE))
+        neighbour_free = np.zeros(free.shape, dtype=bool)
+        neighbour_free[1:, :] |= open_neighbour[:-1, :]
+        neighbour_free[:-1, :] |= open_neighbour[1:, :]
+        neighbour_free[:, 1:] |= open_neighbour[:, :-1]
+        neighbour_free[:, :-1] |= open_neighbour[:, 1:]
+        return free & neighbour_free
+
+    @property
+    def index(self):
+        """Obstacles per OBSTACLE_INDEX_CELL_SIZE bucket, built on the first off-grid query."""
+        if self._index is None:
+            size = OBSTACLE_INDEX_CELL_SIZE
+            self._index = {}
+            for obstacle in self:
+                if isinstance(obstacle, Obstacle):
+                    for bx in range(obstacle.x // size, (obstacle.x + obstacle.width - 1) // size + 1):
+                        for by in range(obstacle.y // size, (obstacle.y + obstacle.height - 1) // size + 1):
+                            self._index.setdefault((bx, by), []).append(obstacle)
+        return self._index
+
+    def is_collision(self, x, y):
+        """True if (x, y) is inside any obstacle."""
+        i, j = x / CELL_SIZE, y / CELL_SIZE
+        columns, rows = self.walkable.shape
+        if i.is_integer() and j.is_integer() and 0 <= i < columns and 0 <= j < rows:
+            if not self.walkable[int(i), int(j)]:
+                return True
+        elif any(o.is_collision(x, y) for o in self.index.get((int(x // OBSTACLE_INDEX_CELL_SIZE),
+                                                                 int(y // OBSTACLE_INDEX_CELL_SIZE)), ())):
+            return True
+        return any(o.is_collision(x, y) for o in self.dynamic)
+
+    def blocks(self, xs, ys):
+        """Vectorised is_collision for arrays of positions."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        i, j = xs / CELL_SIZE, ys / CELL_SIZE
+        columns, rows = self.walkable.shape
+        on_grid = (i == np.floor(i)) & (j == np.floor(j)) & (i >= 0) & (i < columns) & (j >= 0) & (j < rows)
+        blocked = np.zeros(xs.shape, dtype=bool)
+        blocked[on_grid] = ~self.walkable[i[on_grid].astype(np.int64), j[on_grid].astype(np.int64)]
+        for k in zip(*np.nonzero(~on_grid)):
+            blocked[k] = self.is_collision(float(xs[k]), float(ys[k]))
+        for obstacle in self.dynamic:
+            blocked |= obstacle.blocks(xs, ys)
+        return blocked
+
+
+def _mask_rectangles(mask):
+    """Cover the True entries of a 2D (x, y) mask with rectangles (x0, y0, x1, y1).
+
+    Runs along x are merged with the same run in the rows below.
+    """
+    width, height = mask.shape
+    rectangles = []
+    open_runs = {}  # (x0, x1) -> first row
+    for y in range(height + 1):
+        runs = set()
+        if y < height:
+            edges = np.diff(np.concatenate(([0], mask[:, y].astype(np.int8), [0])))
+            runs = set(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+        for run in [run for run in open_runs if run not in runs]:
+            rectangles.append((run[0], open_runs.pop(run), run[1], y))
+        for run in runs:
+            open_runs.setdefault(run, y)
+    return rectangles
+
+
+def load_obstacle_map(path):
+    """ObstacleMap from a JSON list of [x, y, width, height] rectangles, or from an image.
+
+    An image is stretched over the whole world; dark pixels are obstacles.
+    The compiled map (obstacles plus walkable and accessible rasters) is cached
+    in WORLD_CACHE_DIR, keyed by the file and the world geometry, so later runs
+    skip the image processing.
+    """
+    stat = os.stat(path)
+    key = repr((os.path.abspath(path), stat.st_mtime_ns, stat.st_size, WORLD_WIDTH, WORLD_HEIGHT, CELL_SIZE))
+    cache_path = os.path.join(WORLD_CACHE_DIR, hashlib.sha1(key.encode()).hexdigest()[:16] + ".npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            obstacles = _objects_from_columns(Obstacle, {f: cached["obstacle_" + f] for f in OBSTACLE_FIELDS},
+                                              OBSTACLE_FIELDS)
+            return ObstacleMap(obstacles, cached["walkable"], cached["accessible"])
+
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            obstacles = [Obstacle(*map(int, rect)) for rect in json.load(f)]
+    else:
+        import pygame
+        pixels = pygame.surfarray.array3d(pygame.image.load(path))
+        walls = pixels.mean(axis=2) < 128
+        image_width, image_height = walls.shape
+        obstacles = []
+        for x0, y0, x1, y1 in _mask_rectangles(walls):
+            x, y = x0 * WORLD_WIDTH // image_width, y0 * WORLD_HEIGHT // image_height
+            obstacles.append(Obstacle(x, y, x1 * WORLD_WIDTH // image_width - x,
+                                      y1 * WORLD_HEIGHT // image_height - y))
+        print(f"Loaded {len(obstacles)} obstacles from {path}")
+    obstacle_map = ObstacleMap(obstacles)
+
+    # Written under a temporary name first, so parallel workers never read half a file
+    os.makedirs(WORLD_CACHE_DIR, exist_ok=True)
+    temporary = f"{cache_path}.{os.getpid()}.tmp.npz"
+    columns = _columns(obstacle_map, OBSTACLE_FIELDS, np.int64)
+    np.savez(temporary, walkable=obstacle_map.walkable, accessible=obstacle_map.accessible,
+             **{"obstacle_" + field: column for field, column in columns.items()})
+    os.replace(temporary, cache_path)
+    return obstacle_map
+
+
+class LineageStore:
+    """Append-only genealogy of every cell, kept in parallel NumPy arrays.
+
+    One row per cell: id, both parent ids (-1 for founders), birth and death tick
+    (-1 while alive), generation and the LINEAGE_TRAITS values at birth. Parents
+    are always recorded before their children, so ids are sorted and rows can be
+    found with a binary search.
+    """
+
+    COLUMNS = ("ids", "parent_a", "parent_b", "birth_tick", "death_tick", "generation", "traits")
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.parent_a = np.empty(capacity, dtype=np.int64)
+        self.parent_b = np.empty(capacity, dtype=np.int64)
+        self.birth_tick = np.empty(capacity, dtype=np.int64)
+        self.death_tick = np.empty(capacity, dtype=np.int64)
+        self.generation = np.empty(capacity, dtype=np.int64)
+        self.traits = np.empty((capacity, len(LINEAGE_TRAITS)), dtype=np.float64)
+
+    def _grow(self, needed):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = {name: getattr(self, name)[:self.size] for name in self.COLUMNS}
+        self._allocate(capacity)
+        for name, column in old.items():
+            getattr(self, name)[:self.size] = column
+
+    def clear(self):
+        self.size = 0
+
+    def get_state(self):
+        return {name: getattr(self, name)[:self.size].copy() for name in self.COLUMNS}
+
+    def set_state(self, columns):
+        self.size = 0
+        self._grow(len(columns["ids"]))
+        self.size = len(columns["ids"])
+        for name in self.COLUMNS:
+            getattr(self, name)[:self.size] = columns[name]
+
+    def record_births(self, cells, current_tick, parents=None):
+        """Append newly created cells. parents is a list of (parent_a_id, parent_b_id), or None for founders."""
+        count = len(cells)
+        if count == 0:
+            return
+        self._grow(self.size + count)
+        rows = slice(self.size, self.size + count)
+        self.ids[rows] = [cell.id for cell in cells]
+        if parents is None:
+            self.parent_a[rows] = -1
+            self.parent_b[rows] = -1
+        else:
+            self.parent_a[rows], self.parent_b[rows] = np.array(parents, dtype=np.int64).reshape(count, 2).T
+        self.birth_tick[rows] = current_tick
+        self.death_tick[rows] = -1
+        self.generation[rows] = [cell.generation for cell in cells]
+        self.traits[rows] = [[getattr(cell, trait) for trait in LINEAGE_TRAITS] for cell in cells]
+        self.size += count
+
+    def _rows(self, cell_ids):
+        """Row index for each id; -1 for ids that are not (or no longer) in the store."""
+        cell_ids = np.asarray(cell_ids, dtype=np.int64)
+        if self.size == 0:
+            return np.full(cell_ids.shape, -1, dtype=np.int64)
+        ids = self.ids[:self.size]
+        rows = np.minimum(np.searchsorted(ids, cell_ids), self.size - 1)
+        return np.where(ids[rows] == cell_ids, rows, -1)
+
+    def _mark_ancestors(self, mask, frontier):
+        """Set mask for every ancestor of the rows in frontier (an index array)."""
+        while frontier.size:
+            parents = np.concatenate((self.parent_a[frontier], self.parent_b[frontier]))
+            rows = self._rows(parents[parents >= 0])
+            rows = np.unique(rows[rows >= 0])
+            frontier = rows[~mask[rows]]
+            mask[frontier] = True
+        return mask
+
+    def record_death(self, cell_id, current_tick):
+        row = self._rows([cell_id])[0]
+        if row >= 0:
+            self.death_tick[row] = current_tick
+
+    def ancestors(self, cell_id):
+        """Ids of every recorded ancestor of cell_id."""
+        rows = self._rows([cell_id])
+        mask = self._mark_ancestors(np.zeros(self.size, dtype=bool), rows[rows >= 0])
+        return self.ids[:self.size][mask]
+
+    def descendant_mask(self, cell_id):
+        """Boolean mask over the stored rows marking every descendant of cell_id."""
+        mask = np.zeros(self.size, dtype=bool)
+        frontier = np.array([cell_id], dtype=np.int64)
+        while frontier.size:
+            children = (np.isin(self.parent_a[:self.size], frontier) |
+                        np.isin(self.parent_b[:self.size], frontier)) & ~mask
+            mask |= children
+            frontier = self.ids[:self.size][children]
+        return mask
+
+    def descendant_count(self, cell_id):
+        return int(self.descendant_mask(cell_id).sum())
+
+    def _alive_or_ancestor_of_alive(self):
+        """Mask of rows that are alive or have at least one living descendant."""
+        alive = self.death_tick[:self.size] < 0
+        return self._mark_ancestors(alive.copy(), np.flatnonzero(alive))
+
+    def living_lineages(self):
+        """Ids of the founders that still have at least one living descendant (or are alive themselves)."""
+        keep = self._alive_or_ancestor_of_alive()
+        founders = (self.parent_a[:self.size] < 0) & (self.parent_b[:self.size] < 0)
+        return self.ids[:self.size][keep & founders]
+
+    def trait_means_by_generation(self):
+        """Return (generations, means) where means[i] holds the mean of each LINEAGE_TRAITS value in generations[i]."""
+        generations, inverse, counts = np.unique(self.generation[:self.size], return_inverse=True, return_counts=True)
+        means = np.empty((len(generations), len(LINEAGE_TRAITS)))
+        for i in range(len(LINEAGE_TRAITS)):
+            means[:, i] = np.bincount(inverse, weights=self.traits[:self.size, i]) / counts
+        return generations, means
+
+    def prune(self):
+        """Drop dead cells whose lineage has died out, so memory stays bounded over long runs."""
+        keep = self._alive_or_ancestor_of_alive()
+        kept = int(keep.sum())
+        if kept == self.size:
+            return 0
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:kept] = column[:self.size][keep]
+        removed = self.size - kept
+        self.size = kept
+        return removed
+
+
+lineage = LineageStore()
+
+
 def generate_random_obstacles(num_obstacles, max_width, max_height):
     obstacles = []
     for _ in range(num_obstacles):
         width = random.randint(20, max_width)
         height = random.randint(20, max_height)
-        x = random.randint(0, SCREEN_WIDTH - width)
-        y = random.randint(0, SCREEN_HEIGHT - height)
+        x = random.randint(0, WORLD_WIDTH - width)
+        y = random.randint(0, WORLD_HEIGHT - height)
         obstacles.append(Obstacle(x, y, width, height))
-    return obstacles
+    return ObstacleMap(obstacles)
 
 
 def is_position_accessible(x, y, obstacles):
     """Check if a position is accessible to cells by ensuring there's a clear path from nearby positions."""
     # Check if the position itself is blocked
-    if any(obstacle.is_collision(x, y) for obstacle in obstacles):
+    if obstacles.is_collision(x, y):
         return False
     
     # Check if at least one adjacent position is accessible
@@ -455,116 +1196,235 @@ def is_position_accessible(x, y, obstacles):
     ]
     
     for adj_x, adj_y in adjacent_positions:
-        if (0 <= adj_x < SCREEN_WIDTH - CELL_SIZE and 
-            0 <= adj_y < SCREEN_HEIGHT - CELL_SIZE and
-            not any(obstacle.is_collision(adj_x, adj_y) for obstacle in obstacles)):
+        if (0 <= adj_x < WORLD_WIDTH - CELL_SIZE and 
+            0 <= adj_y < WORLD_HEIGHT - CELL_SIZE and
+            not obstacles.is_collision(adj_x, adj_y)):
             return True
     
     return False
 
 
-def respawn_food(food_cells, obstacles, current_tick=0):
-    if len(food_cells) < MIN_FOOD_CELLS:
-        spawn_rate = 1.0
-    else:
-        relative_food_cells = (MAX_FOOD_CELLS - len(food_cells)) / (MAX_FOOD_CELLS - MIN_FOOD_CELLS)
-        spawn_rate = FOOD_RESPAWN_RATE * relative_food_cells
-    if len(food_cells) < MAX_FOOD_CELLS and random.random() < spawn_rate:
-        mean_x = SCREEN_WIDTH / 2
-        mean_y = SCREEN_HEIGHT / 2
-        std_dev = min(SCREEN_WIDTH, SCREEN_HEIGHT) / 4
-        attempts = 0
-        max_attempts = 50  # Prevent infinite loops
-        while attempts < max_attempts:
-            new_x = max(0, min(int(random.gauss(mean_x, std_dev)), SCREEN_WIDTH - CELL_SIZE))
-            new_y = max(0, min(int(random.gauss(mean_y, std_dev)), SCREEN_HEIGHT - CELL_SIZE))
-            new_x = (new_x // CELL_SIZE) * CELL_SIZE
-            new_y = (new_y // CELL_SIZE) * CELL_SIZE
-            if is_position_accessible(new_x, new_y, obstacles):
-                new_food = Food(new_x, new_y, current_tick)
-                food_cells.append(new_food)
-                break
-            attempts += 1
-
-
-def draw_debug_view(screen, cell, center_x, center_y, font):
-    """Draw debug information for a single cell."""
-    # Energy bar (stamina)
-    energy_ratio = cell.stamina / MAX_STAMINA
-    energy_bar_width = CELL_SIZE * 3
-    energy_bar_height = 3
-    energy_bar_x = cell.x - energy_bar_width // 2 + CELL_SIZE // 2
-    energy_bar_y = cell.y - 15  # Above the cell
-    pygame.draw.rect(screen, WHITE, (energy_bar_x, energy_bar_y, energy_bar_width, energy_bar_height), 1)  # Border
-    pygame.draw.rect(screen, YELLOW, (energy_bar_x, energy_bar_y, energy_bar_width * energy_ratio, energy_bar_height))  # Fill
-
-    # Food bar (Hunger)
-    food_ratio = cell.hunger / MAX_HUNGER
-    food_bar_width = CELL_SIZE * 3
-    food_bar_height = 3
-    food_bar_x = cell.x - energy_bar_width // 2 + CELL_SIZE // 2
-    food_bar_y = cell.y - 10  # Above the cell
-    pygame.draw.rect(screen, WHITE, (food_bar_x, food_bar_y, food_bar_width, food_bar_height), 1)  # Border
-    pygame.draw.rect(screen, GREEN, (food_bar_x, food_bar_y, food_bar_width * food_ratio, food_bar_height))  # Fill
-
-    # Health bar
-    health_ratio = cell.hp / MAX_HP
-    health_bar_width = CELL_SIZE * 3
-    health_bar_height = 3
-    health_bar_x = cell.x - health_bar_width // 2 + CELL_SIZE // 2
-    health_bar_y = energy_bar_y - 5  # Above the energy bar
-    pygame.draw.rect(screen, WHITE, (health_bar_x, health_bar_y, health_bar_width, health_bar_height), 1)  # Border
-    pygame.draw.rect(screen, RED, (health_bar_x, health_bar_y, health_bar_width * health_ratio, health_bar_height))  # Fill
-
-    # Direction indicator
-    if cell.direction_x != 0 or cell.direction_y != 0:
-        dir_length = math.hypot(cell.direction_x, cell.direction_y)
-        if dir_length != 0:
-            dir_x_norm = cell.direction_x / dir_length
-            dir_y_norm = cell.direction_y / dir_length
-
-            # Set the length of the direction line
-            dir_line_length = CELL_SIZE * 2
-
-            # Calculate end point of the line
-            end_x = cell.x + CELL_SIZE // 2 + dir_x_norm * dir_line_length
-            end_y = cell.y + CELL_SIZE // 2 + dir_y_norm * dir_line_length
-
-            pygame.draw.line(screen, GREEN, (cell.x + CELL_SIZE // 2, cell.y + CELL_SIZE // 2),
-                             (end_x, end_y), 2)
-
-    # Distance to center
-    distance_to_center = math.hypot(cell.x - center_x, cell.y - center_y)
-    distance_text = font.render(f"{int(distance_to_center)}", True, WHITE)
-    text_x = cell.x - distance_text.get_width() // 2 + CELL_SIZE // 2
-    text_y = cell.y + CELL_SIZE + 5  # Below the cell
-    screen.blit(distance_text, (text_x, text_y))
-
-    # Energy usage multiplier
-    energy_multiplier = calculate_energy_multiplier(cell)  # Get the multiplier
-    energy_text = font.render(f"×{energy_multiplier:.2f}", True, WHITE)
-    text_x = cell.x - energy_text.get_width() // 2 + CELL_SIZE // 2
-    text_y = cell.y + CELL_SIZE + 16  # Below the cell
-    screen.blit(energy_text, (text_x, text_y))
-
+class FoodSpawner:
+    """Spawns food in Poisson batches from a precomputed distribution over the free grid slots.
+
+    Built for one set of obstacles; food_spawner() rebuilds it when the
+    obstacles, the world size or the distribution change.
+    """
+
+    def __init__(self, obstacles, distribution=None, patches=None):
+        self.obstacles = obstacles
+        self.distribution = distribution or FOOD_DISTRIBUTION
+        self.patches = food_patches if patches is None else patches
+        self.world_size = (WORLD_WIDTH, WORLD_HEIGHT)
+
+        # Accessible grid-aligned slots, as reachable by the old clamped gaussian draw
+        columns = (WORLD_WIDTH - CELL_SIZE) // CELL_SIZE + 1
+        rows = (WORLD_HEIGHT - CELL_SIZE) // CELL_SIZE + 1
+        i, j = np.nonzero(obstacles.accessible[:columns, :rows])
+        self.xs = i * CELL_SIZE
+        self.ys = j * CELL_SIZE
+
+        weights = self.weights(self.xs, self.ys)
+        total = weights.sum()
+        self.cdf = np.cumsum(weights) / total if total > 0 else None
+
+    def weights(self, xs, ys):
+        """Relative spawn probability of each slot."""
+        if self.distribution == "uniform":
+            return np.ones(len(xs))
+        if self.distribution == "gaussian":
+            std_dev = min(WORLD_WIDTH, WORLD_HEIGHT) / 4
+            return np.exp(-((xs - WORLD_WIDTH / 2) ** 2 + (ys - WORLD_HEIGHT / 2) ** 2) / (2 * std_dev ** 2))
+        if self.distribution == "patches":
+            weights = np.zeros(len(xs))
+            for patch_x, patch_y in self.patches:
+                weights += np.exp(-((xs - patch_x) ** 2 + (ys - patch_y) ** 2) / (2 * FOOD_PATCH_RADIUS ** 2))
+            return weights
+        raise ValueError(f"Unknown food distribution: {self.distribution}")
+
+    def matches(self, obstacles):
+        return (self.obstacles is obstacles and self.distribution == FOOD_DISTRIBUTION and
+                self.patches is food_patches and self.world_size == (WORLD_WIDTH, WORLD_HEIGHT))
+
+    def expected_spawns(self, total_food):
+        """Mean number of food cells to spawn this tick."""
+        if total_food >= MAX_FOOD_CELLS:
+            return 0.0
+        # MIN_FOOD_CELLS can be raised up to MAX_FOOD_CELLS and past it (hotkey, config)
+        relative_food_cells = (MAX_FOOD_CELLS - total_food) / max(MAX_FOOD_CELLS - MIN_FOOD_CELLS, 1)
+        if total_food < MIN_FOOD_CELLS:
+            # At least one per tick below the minimum, where the old spawn probability was 1.0
+            return max(FOOD_RESPAWN_RATE * relative_food_cells, 1.0)
+        return FOOD_RESPAWN_RATE * relative_food_cells
+
+    def spawn(self, total_food, current_tick):
+        """Draw this tick's batch of new Food."""
+        if self.cdf is None:
+            return []
+        count = min(int(rng.poisson(self.expected_spawns(total_food))), MAX_FOOD_CELLS - total_food)
+        if count <= 0:
+            return []
+        slots = np.searchsorted(self.cdf, rng.random(count), side="right")
+        return [Food(x, y, current_tick) for x, y in zip(self.xs[slots].tolist(), self.ys[slots].tolist())]
+
+
+_food_spawner = None
+
+
+def food_spawner(obstacles):
+    """The FoodSpawner for obstacles, reused until the world or the food settings change."""
+    global _food_spawner
+    if _food_spawner is None or not _food_spawner.matches(obstacles):
+        _food_spawner = FoodSpawner(obstacles)
+    return _food_spawner
+
+
+def random_food_patches():
+    """Centres of the food hotspots for the "patches" distribution."""
+    return rng.uniform((0, 0), (WORLD_WIDTH, WORLD_HEIGHT), size=(FOOD_PATCH_COUNT, 2))
+
+
+def respawn_food(food_cells, obstacles, current_tick=0, total_food=None):
+    """Spawn this tick's food into food_cells, see FoodSpawner.
+
+    total_food overrides len(food_cells) as the amount of food in the world, for
+    callers (chunked worlds) whose list only holds part of it.
+    """
+    if total_food is None:
+        total_food = len(food_cells)
+    food_cells.extend(food_spawner(obstacles).spawn(total_food, current_tick))
+
+
+class TextCache:
+    """Rendered texts of a font, so labels that repeat from frame to frame are rendered once.
+
+    Holds at most `size` texts; it starts over when full.
+    """
+
+    def __init__(self, font, color=WHITE, size=TEXT_CACHE_SIZE):
+        self.font = font
+        self.color = color
+        self.size = size
+        self.texts = {}
+
+    def centered(self, text, x, y):
+        """(surface, position) that draws text horizontally centered on x, for Surface.blits."""
+        surface = self.texts.get(text)
+        if surface is None:
+            if len(self.texts) >= self.size:
+                self.texts.clear()
+            surface = self.texts[text] = self.font.render(text, True, self.color)
+        return surface, (x - surface.get_width() // 2, y)
+
+
+class DebugOverlay:
+    """Health, stamina and hunger bars, heading and energy numbers for the cells in view (F1).
+
+    The bars of all cells are written into one RGBA array with NumPy, and only
+    the block of bars above each cell is blitted from it (blitting the whole
+    screen-sized surface costs more than everything else put together). The
+    numbers come from a TextCache. With more than
+    DEBUG_OVERLAY_LIMIT cells in view only the ones closest to the cursor get an overlay.
+    """
+
+    BAR_WIDTH = CELL_SIZE * 3
+    BAR_HEIGHT = 3
+    # Bar colour and offset above the cell, top to bottom
+    BARS = ((RED, -20), (YELLOW, -15), (GREEN, -10))
+
+    def __init__(self, font, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        import pygame
+        self.text_cache = TextCache(font)
+        self.pixels = np.zeros((height, width, 4), dtype=np.uint8)
+        self.words = self.pixels.view(np.uint32).reshape(-1)  # One word per pixel, row by row
+        # BGRA is the byte order of the display surface, so blits need no conversion
+        self.surface = pygame.image.frombuffer(self.pixels, (width, height), "BGRA")
+
+        # One bar per row of the template: white border, transparent inside
+        template = np.zeros((len(self.BARS), self.BAR_HEIGHT, self.BAR_WIDTH, 4), dtype=np.uint8)
+        template[:, [0, -1], :] = (*WHITE[::-1], 255)
+        template[:, :, [0, -1]] = (*WHITE[::-1], 255)
+        self.template = template.view(np.uint32)[..., 0]
+        self.colors = np.array([(*color[::-1], 255) for color, _ in self.BARS], dtype=np.uint8).view(np.uint32)[:, 0]
+        self.offsets = np.array([offset for _, offset in self.BARS])
+        self.block_height = self.offsets.max() - self.offsets.min() + self.BAR_HEIGHT
+        self.written = None  # Indices into words of the last frame's bars, cleared before the next
+
+    def draw(self, screen, cells, camera, cursor):
+        import pygame
+        if not cells:
+            return
+        if len(cells) > DEBUG_OVERLAY_LIMIT:
+            cursor_x, cursor_y = camera.screen_to_world(*cursor)
+            distance = np.fromiter((abs(cell.x - cursor_x) + abs(cell.y - cursor_y) for cell in cells),
+                                   dtype=np.float64, count=len(cells))
+            cells = [cells[i] for i in np.argpartition(distance, DEBUG_OVERLAY_LIMIT)[:DEBUG_OVERLAY_LIMIT]]
+
+        world_x = np.array([cell.x for cell in cells], dtype=np.float64)
+        world_y = np.array([cell.y for cell in cells], dtype=np.float64)
+        half = CELL_SIZE * camera.zoom / 2
+        center_x = (world_x - camera.x) * camera.zoom + half
+        center_y = (world_y - camera.y) * camera.zoom + half
+        ratios = np.array([(cell.hp / MAX_HP, cell.stamina / MAX_STAMINA, cell.hunger / MAX_HUNGER)
+                           for cell in cells]).clip(0, 1)
+
+        # Bars: (cells, bars, rows, columns) BGRA words
+        columns = np.arange(self.BAR_WIDTH)
+        rows = np.arange(self.BAR_HEIGHT)
+        filled = columns < np.floor(ratios * self.BAR_WIDTH)[..., None]
+        bars = np.where(filled[:, :, None, :], self.colors[None, :, None, None], self.template[None])
+        xs = (center_x.astype(np.int64) - self.BAR_WIDTH // 2)[:, None, None, None] + columns
+        ys = ((center_y - half).astype(np.int64)[:, None] + self.offsets)[:, :, None, None] + rows[:, None]
+        xs, ys = np.broadcast_arrays(xs, ys)
+        height, width = self.pixels.shape[:2]
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        if self.written is not None:
+            self.words[self.written] = 0
+        self.written = (ys * width + xs)[inside]
+        self.words[self.written] = bars[inside]
+        left = (center_x.astype(np.int64) - self.BAR_WIDTH // 2).tolist()
+        top = ((center_y - half).astype(np.int64) + self.offsets.min()).tolist()
+        screen.blits([(self.surface, (x, y), (x, y, self.BAR_WIDTH, self.block_height)) for x, y in zip(left, top)],
+                     doreturn=False)
+
+        # Heading lines
+        line_length = CELL_SIZE * 2
+        for cell, x, y in zip(cells, center_x.tolist(), center_y.tolist()):
+            dir_length = math.hypot(cell.direction_x, cell.direction_y)
+            if dir_length != 0:
+                end = (x + cell.direction_x / dir_length * line_length, y + cell.direction_y / dir_length * line_length)
+                pygame.draw.line(screen, GREEN, (x, y), end, 2)
+
+        # Distance to the world center and the energy multiplier it gives (see calculate_energy_multiplier)
+        distance = np.hypot(world_x - WORLD_WIDTH // 2, world_y - WORLD_HEIGHT // 2)
+        multiplier = 1 + distance / math.hypot(WORLD_WIDTH // 2, WORLD_HEIGHT // 2) * 0.5
+        text_y = (center_y + half).tolist()
+        centered = self.text_cache.centered
+        blits = []
+        for x, y, dist, mult in zip(center_x.tolist(), text_y, distance.astype(np.int64).tolist(), multiplier.tolist()):
+            blits.append(centered(str(dist), x, y + 5))
+            blits.append(centered(f"×{mult:.2f}", x, y + 16))
+        screen.blits(blits, doreturn=False)
 
 
 def reset_simulation(num_cells, num_food, obstacles):
     """Reset simulation state with new cells and food."""
-    cells = [
-        Cell(
-            random.randint(0, SCREEN_WIDTH // CELL_SIZE) * CELL_SIZE,
-            random.randint(0, SCREEN_HEIGHT // CELL_SIZE) * CELL_SIZE
-        )
-        for _ in range(num_cells)
-    ]
+    positions = [(random.randint(0, WORLD_WIDTH // CELL_SIZE - 1) * CELL_SIZE,
+                  random.randint(0, WORLD_HEIGHT // CELL_SIZE - 1) * CELL_SIZE)
+                 for _ in range(num_cells)]
+    # All founder genomes and their traits in one go (the same draws as one cell at a time)
+    genomes = founder_genomes(num_cells)
+    cells = [Cell(x, y, genome=genome, phenotype=phenotype)
+             for (x, y), genome, phenotype in zip(positions, pack_genomes(genomes), phenotype_rows(genomes))]
+    lineage.clear()
+    lineage.record_births(cells, len(ticks))
     food_cells = []
     current_tick = 0
     attempts = 0
     max_attempts = 1000  # Prevent infinite loops
     while len(food_cells) < num_food and attempts < max_attempts:
-        x = random.randint(0, SCREEN_WIDTH // CELL_SIZE) * CELL_SIZE
-        y = random.randint(0, SCREEN_HEIGHT // CELL_SIZE) * CELL_SIZE
+        x = random.randint(0, WORLD_WIDTH // CELL_SIZE - 1) * CELL_SIZE
+        y = random.randint(0, WORLD_HEIGHT // CELL_SIZE - 1) * CELL_SIZE
         if is_position_accessible(x, y, obstacles):
             food_cells.append(Food(x, y, current_tick))
         attempts += 1
@@ -572,6 +1432,7 @@ def reset_simulation(num_cells, num_food, obstacles):
 
 def draw_stats_sidebar(screen, font, live_cells, food_cells, highest_generation, live_cells_history, food_cells_history, graph_surface_cells, graph_surface_food, max_ticks=0):
     """Draw a sidebar with statistics and two graphs."""
+    import pygame
     sidebar_width = 300
     sidebar_x = SCREEN_WIDTH  # Sidebar starts where the main screen ends
     graph_height = 75
@@ -651,75 +1512,2142 @@ def draw_stats_sidebar(screen, font, live_cells, food_cells, highest_generation,
 
 def calculate_energy_multiplier(cell):
     """Calculate the energy usage multiplier based on distance from the center."""
-    center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
+    center_x, center_y = WORLD_WIDTH // 2, WORLD_HEIGHT // 2
     distance = math.hypot(cell.x - center_x, cell.y - center_y)
 
     # Normalize the distance to create a multiplier
-    max_distance = math.hypot(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+    max_distance = math.hypot(WORLD_WIDTH // 2, WORLD_HEIGHT // 2)
     multiplier = 1 + (distance / max_distance) * 0.5  # Reduced from 2 - much less punishing
     return multiplier
 
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH + 300, SCREEN_HEIGHT)) # extend for sidebar
-    pygame.display.set_caption("Pixel Life")
 
-    graph_surface_cells = pygame.Surface((300, 75))
-    graph_surface_cells.fill(BLACK)
-    graph_surface_food = pygame.Surface((300, 75))
-    graph_surface_food.fill(BLACK)
 
-    # Generate obstacles before resetting
-    obstacles = generate_random_obstacles(NUM_OBSTACLES, MAX_OBSTACLE_WIDTH, MAX_OBSTACLE_HEIGHT)
+def build_spatial_grid(cells, cell_size=GRID_CELL_SIZE):
+    """Build a SpatialGrid holding cells."""
+    spatial_grid = SpatialGrid(WORLD_WIDTH, WORLD_HEIGHT, cell_size)
+    spatial_grid.add_many(cells)
+    return spatial_grid
+
+
+def reset_counters():
+    global mating_attempts, mating_successes, food_despawned_count
+    mating_attempts = 0
+    mating_successes = 0
+    food_despawned_count = 0
 
-    # Call reset with obstacles
-    cells, food_cells = reset_simulation(NUM_INITIAL_CELLS, NUM_INITIAL_FOOD, obstacles)
-    spatial_grid = SpatialGrid(SCREEN_WIDTH, SCREEN_HEIGHT, GRID_CELL_SIZE)
+
+def seed_simulation(seed):
+    """Seed the random number generators so a run can be reproduced."""
+    random.seed(seed)
+    rng.bit_generator.state = np.random.default_rng(seed).bit_generator.state
+
+
+def record_history(cells, food_cells):
+    """Append the current population stats to the graph histories and return the tick number."""
+    highest_generation = max((cell.generation for cell in cells), default=0)
+    live_cells_history.append(len(cells))
+    food_cells_history.append(len(food_cells))
+    # Ensure synchronized updates for ticks and histories
+    ticks.append(len(ticks) + 1)
+    highest_generation_history.append(highest_generation)
+    return len(ticks)
+
+
+# Every neighbouring grid slot a newborn can be placed on
+BIRTH_OFFSETS = np.array([(dx, dy) for dx in (-CELL_SIZE, 0, CELL_SIZE)
+                          for dy in (-CELL_SIZE, 0, CELL_SIZE) if dx or dy])
+
+
+def slot_keys(xs, ys):
+    """Integer key of the CELL_SIZE grid slot at each (in bounds) position."""
+    return ((np.asarray(xs) // CELL_SIZE).astype(np.int64) * (WORLD_HEIGHT // CELL_SIZE + 1)
+            + (np.asarray(ys) // CELL_SIZE).astype(np.int64))
+
+
+def blocked_by_obstacles(xs, ys, obstacles):
+    """Boolean array: which of the positions are inside an obstacle."""
+    return obstacles.blocks(xs, ys)
+
+
+def resolve_births(pairs, cells, spatial_grid, obstacles, current_tick):
+    """Create the offspring of every pair that finished mating this tick in one batch.
+
+    Free slots around each pair come from a single occupancy lookup, mutations are
+    drawn as arrays and the newborns are added to the grid in one go. Returns the
+    new cells (the caller appends them to the cell list).
+    """
+    if not pairs:
+        return []
+    parents_a = [a for a, _ in pairs]
+    parents_b = [b for _, b in pairs]
+    num_pairs = len(pairs)
+
+    # Candidate slots around the first parent of each pair
+    candidate_x = np.array([a.x for a in parents_a])[:, None] + BIRTH_OFFSETS[:, 0]
+    candidate_y = np.array([a.y for a in parents_a])[:, None] + BIRTH_OFFSETS[:, 1]
+    free = ((candidate_x >= 0) & (candidate_x < WORLD_WIDTH) &
+            (candidate_y >= 0) & (candidate_y < WORLD_HEIGHT))
+    free &= ~blocked_by_obstacles(candidate_x, candidate_y, obstacles)
+    candidate_keys = slot_keys(candidate_x, candidate_y)
+    occupied = slot_keys([cell.x for cell in cells], [cell.y for cell in cells])
+    free &= ~np.isin(candidate_keys, occupied)
+
+    # Each pair has 1-3 children on randomly chosen free slots
+    num_offspring = rng.integers(1, 4, size=num_pairs)
+    order = np.argsort(np.where(free, rng.random(free.shape), 2.0), axis=1)
+    rank = np.empty_like(order)
+    np.put_along_axis(rank, order, np.broadcast_to(np.arange(order.shape[1]), order.shape), axis=1)
+    pair_idx, slot_idx = np.nonzero(free & (rank < num_offspring[:, None]))
+
+    # Neighbouring pairs can pick the same slot; the first pair keeps it
+    _, first = np.unique(candidate_keys[pair_idx, slot_idx], return_index=True)
+    first.sort()
+    pair_idx, slot_idx = pair_idx[first], slot_idx[first]
+    count = len(pair_idx)
+    if count == 0:
+        return []
+
+    # Crossover, mutation and expression for all children at once
+    genomes_a = unpack_genomes([cell.genome for cell in parents_a])[pair_idx]
+    genomes_b = unpack_genomes([cell.genome for cell in parents_b])[pair_idx]
+    genomes = inherit_genomes(genomes_a, genomes_b)
+    phenotypes = phenotype_rows(genomes)
+    packed = pack_genomes(genomes)
+
+    offspring = []
+    parent_ids = []
+    xs = candidate_x[pair_idx, slot_idx].tolist()
+    ys = candidate_y[pair_idx, slot_idx].tolist()
+    for i, p in enumerate(pair_idx.tolist()):
+        new_cell = Cell(xs[i], ys[i], parents_a[p].generation + 1, packed[i], phenotypes[i])
+        new_cell.mating_cooldown = NEWBORN_MATING_COOLDOWN
+        offspring.append(new_cell)
+        parent_ids.append((parents_a[p].id, parents_b[p].id))
+
+    spatial_grid.add_many(offspring)
+    lineage.record_births(offspring, current_tick, parent_ids)
+    print(f"{count} cells have been spawned from {num_pairs} pairs")
+    return offspring
+
+
+# Random walk directions in the order move_randomly lists them: up, down, left, right
+RANDOM_DIRECTIONS = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)])
+
+
+def _plan_moves_numpy(x, y, hunger, stamina, speed, active, thinking, has_target, target_x, target_y,
+                      direction_x, direction_y, escape_roll, order, limits):
+    """NumPy version of plan_moves: every branch as a masked array operation."""
+    (cell_size, world_width, world_height, center_distance, stamina_per_step, idle_stamina_gain,
+     initial_stamina, idle_hunger, max_stamina) = limits
+    n = len(x)
+    # Stamina and hunger, as in move_towards / move_randomly
+    toward = thinking & has_target
+    wander = thinking & ~has_target
+    rested = stamina <= 0
+    center_x, center_y = world_width // 2, world_height // 2
+    multiplier = 1 + (np.hypot(x - center_x, y - center_y) / center_distance) * 0.5
+    spend = thinking & ~rested
+    stamina[spend] -= stamina_per_step * multiplier[spend]
+    recover = toward & rested
+    stamina[recover] = np.minimum(stamina[recover] + idle_stamina_gain, initial_stamina)
+    hunger[toward] += idle_hunger
+    stamina[thinking] -= stamina_per_step
+    idle = active & ~thinking
+    stamina[idle] = np.minimum(stamina[idle] + idle_stamina_gain, max_stamina)
+
+    # Candidate slots: column 0 is the step towards the target or the edge escape,
+    # columns 1-4 the random walk directions in this cell's shuffled order
+    candidate_x = np.tile(x[:, None], 5)
+    candidate_y = np.tile(y[:, None], 5)
+    valid = np.zeros((n, 5), dtype=bool)
+    candidate_dx = np.zeros((n, 5))
+    candidate_dy = np.zeros((n, 5))
+    step = cell_size * np.where(speed > 0, speed, 1)
+
+    walking = toward & ~rested
+    dx = target_x - x
+    dy = target_y - y
+    distance = np.sqrt(dx ** 2 + dy ** 2)
+    seen = distance > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        unit_x = np.where(seen, dx / distance, dx)
+        unit_y = np.where(seen, dy / distance, dy)
+    towards_step = np.minimum(step, distance)
+    new_x = np.clip(x + unit_x * towards_step, 0, world_width - cell_size) // cell_size * cell_size
+    new_y = np.clip(y + unit_y * towards_step, 0, world_height - cell_size) // cell_size * cell_size
+    candidate_x[walking, 0] = new_x[walking]
+    candidate_y[walking, 0] = new_y[walking]
+    valid[walking, 0] = True
+    turned = walking & seen
+    direction_x[turned] = unit_x[turned]
+    direction_y[turned] = unit_y[turned]
+
+    near_edge = ((x < cell_size * 2) | (x > world_width - cell_size * 3) |
+                 (y < cell_size * 2) | (y > world_height - cell_size * 3))
+    away_x = center_x - x
+    away_y = center_y - y
+    away_distance = np.sqrt(away_x ** 2 + away_y ** 2)
+    escape = wander & near_edge & (escape_roll < 0.7) & (away_distance > 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        away_x = away_x / away_distance
+        away_y = away_y / away_distance
+    candidate_x[escape, 0] = ((x + away_x * cell_size) // cell_size * cell_size)[escape]
+    candidate_y[escape, 0] = ((y + away_y * cell_size) // cell_size * cell_size)[escape]
+    valid[escape, 0] = True
+    candidate_dx[:, 0] = away_x
+    candidate_dy[:, 0] = away_y
+
+    walk_dx = RANDOM_DIRECTIONS[order, 0]
+    walk_dy = RANDOM_DIRECTIONS[order, 1]
+    can_step = np.stack([y > 0, y < world_height - cell_size, x > 0, x < world_width - cell_size], axis=1)
+    candidate_x[:, 1:] = (x[:, None] + walk_dx * step[:, None]) // cell_size * cell_size
+    candidate_y[:, 1:] = (y[:, None] + walk_dy * step[:, None]) // cell_size * cell_size
+    valid[:, 1:] = wander[:, None] & np.take_along_axis(can_step, order, axis=1)
+    candidate_dx[:, 1:] = walk_dx
+    candidate_dy[:, 1:] = walk_dy
+
+    # Cells walking to a target have one candidate, wandering cells all five
+    attempts = np.where(wander, 5, np.where(walking, 1, 0))
+    return candidate_x, candidate_y, valid, candidate_dx, candidate_dy, attempts, wander
+
+
+def _plan_moves_loop(x, y, hunger, stamina, speed, active, thinking, has_target, target_x, target_y,
+                     direction_x, direction_y, escape_roll, order, limits):
+    """Per-cell loop version of plan_moves, the branches of move_towards and
+    move_randomly, compiled with Numba by the "numba" backend."""
+    (cell_size, world_width, world_height, center_distance, stamina_per_step, idle_stamina_gain,
+     initial_stamina, idle_hunger, max_stamina) = limits
+    n = len(x)
+    center_x, center_y = world_width // 2, world_height // 2
+    candidate_x = np.empty((n, 5))
+    candidate_y = np.empty((n, 5))
+    valid = np.zeros((n, 5), dtype=np.bool_)
+    candidate_dx = np.zeros((n, 5))
+    candidate_dy = np.zeros((n, 5))
+    attempts = np.zeros(n, dtype=np.int64)
+    wander = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        xi = x[i]
+        yi = y[i]
+        for column in range(5):
+            candidate_x[i, column] = xi
+            candidate_y[i, column] = yi
+        if not thinking[i]:
+            if active[i]:
+                stamina[i] = min(stamina[i] + idle_stamina_gain, max_stamina)
+            continue
+
+        rested = stamina[i] <= 0
+        if not rested:
+            multiplier = 1 + (math.hypot(xi - center_x, yi - center_y) / center_distance) * 0.5
+            stamina[i] -= stamina_per_step * multiplier
+        elif has_target[i]:
+            stamina[i] = min(stamina[i] + idle_stamina_gain, initial_stamina)
+        if has_target[i]:
+            hunger[i] += idle_hunger
+        stamina[i] -= stamina_per_step
+        step = cell_size * (speed[i] if speed[i] > 0 else 1.0)
+
+        if has_target[i]:
+            if rested:
+                continue
+            dx = target_x[i] - xi
+            dy = target_y[i] - yi
+            distance = math.sqrt(dx * dx + dy * dy)
+            if distance > 0:
+                dx /= distance
+                dy /= distance
+                direction_x[i] = dx
+                direction_y[i] = dy
+            towards_step = min(step, distance)
+            candidate_x[i, 0] = min(max(xi + dx * towards_step, 0), world_width - cell_size) // cell_size * cell_size
+            candidate_y[i, 0] = min(max(yi + dy * towards_step, 0), world_height - cell_size) // cell_size * cell_size
+            valid[i, 0] = True
+            attempts[i] = 1
+            continue
+
+        wander[i] = True
+        attempts[i] = 5
+        away_x = center_x - xi
+        away_y = center_y - yi
+        away_distance = math.sqrt(away_x * away_x + away_y * away_y)
+        if away_distance > 0:
+            away_x /= away_distance
+            away_y /= away_distance
+            candidate_dx[i, 0] = away_x
+            candidate_dy[i, 0] = away_y
+            near_edge = (xi < cell_size * 2 or xi > world_width - cell_size * 3 or
+                         yi < cell_size * 2 or yi > world_height - cell_size * 3)
+            if near_edge and escape_roll[i] < 0.7:
+                candidate_x[i, 0] = (xi + away_x * cell_size) // cell_size * cell_size
+                candidate_y[i, 0] = (yi + away_y * cell_size) // cell_size * cell_size
+                valid[i, 0] = True
+        for k in range(4):
+            direction = order[i, k]
+            walk_dx = RANDOM_DIRECTIONS[direction, 0]
+            walk_dy = RANDOM_DIRECTIONS[direction, 1]
+            candidate_x[i, k + 1] = (xi + walk_dx * step) // cell_size * cell_size
+            candidate_y[i, k + 1] = (yi + walk_dy * step) // cell_size * cell_size
+            candidate_dx[i, k + 1] = walk_dx
+            candidate_dy[i, k + 1] = walk_dy
+            if direction == 0:
+                valid[i, k + 1] = yi > 0
+            elif direction == 1:
+                valid[i, k + 1] = yi < world_height - cell_size
+            elif direction == 2:
+                valid[i, k + 1] = xi > 0
+            else:
+                valid[i, k + 1] = xi < world_width - cell_size
+    return candidate_x, candidate_y, valid, candidate_dx, candidate_dy, attempts, wander
+
+
+def plan_moves(x, y, hunger, stamina, speed, active, thinking, has_target, target_x, target_y,
+               direction_x, direction_y, escape_roll, order):
+    """Stamina, hunger and candidate slots of every cell, as move_towards / move_randomly would have them.
+
+    Thinking cells with a target step towards it (unless rested); thinking cells
+    without one wander: an edge escape if escape_roll < 0.7 near the border,
+    then the four directions in the order given by order. Updates hunger,
+    stamina and the directions of cells turning towards a target in place.
+    Returns (candidate_x, candidate_y, valid, candidate_dx, candidate_dy,
+    attempts, wander), with valid not yet checked against obstacles and other cells.
+    """
+    limits = (CELL_SIZE, WORLD_WIDTH, WORLD_HEIGHT, math.hypot(WORLD_WIDTH // 2, WORLD_HEIGHT // 2),
+              STAMINA_PER_STEP, IDLE_STAMINA_GAIN, CELL_INITIAL_STAMINA, IDLE_HUNGER_CONSUMPTION, MAX_STAMINA)
+    plan = plan_moves_numba() if MOVEMENT_BACKEND == "numba" else _plan_moves_numpy
+    return plan(x, y, hunger, stamina, speed, active, thinking, has_target, target_x, target_y,
+                direction_x, direction_y, escape_roll, order, limits)
+
+
+def _claim_slots_numpy(keys, valid, stays, priority, attempts):
+    """NumPy version of claim_slots: one vectorised round per candidate column."""
+    n = len(keys)
+    chosen = np.full(n, -1)
+    pending = np.flatnonzero(attempts > 0)
+    claimed = np.zeros(0, dtype=np.int64)
+    column = 0
+    while pending.size:
+        key = keys[pending, column]
+        ok = valid[pending, column] & (stays[pending, column] | ~np.isin(key, claimed))
+        contenders = pending[ok]
+        contender_keys = key[ok]
+        by_slot = np.lexsort((priority[contenders], contender_keys))
+        first = np.ones(len(by_slot), dtype=bool)
+        first[1:] = contender_keys[by_slot][1:] != contender_keys[by_slot][:-1]
+        chosen[contenders[by_slot[first]]] = column
+        claimed = np.concatenate((claimed, contender_keys[by_slot[first]]))
+        column += 1
+        pending = pending[(chosen[pending] < 0) & (attempts[pending] > column)]
+    return chosen
+
+
+def _claim_slots_loop(keys, valid, stays, priority, attempts, slot_count):
+    """Plain loop version of claim_slots, compiled with Numba by the "numba" backend."""
+    n, columns = keys.shape
+    chosen = np.full(n, -1, dtype=np.int64)
+    claimed = np.zeros(slot_count, dtype=np.bool_)
+    best = np.full(slot_count, -1, dtype=np.int64)
+    for column in range(columns):
+        for i in range(n):
+            if chosen[i] < 0 and column < attempts[i] and valid[i, column]:
+                key = keys[i, column]
+                if stays[i, column] or not claimed[key]:
+                    j = best[key]
+                    if j < 0 or priority[i] < priority[j]:
+                        best[key] = i
+        for i in range(n):
+            if chosen[i] < 0 and column < attempts[i] and valid[i, column]:
+                key = keys[i, column]
+                if best[key] == i:
+                    chosen[i] = column
+                    claimed[key] = True
+                    best[key] = -1
+    return chosen
+
+
+_numba_kernels = {}  # Loop function -> its compiled version
+
+
+def _compiled(function):
+    """function compiled with Numba, on first use."""
+    kernel = _numba_kernels.get(function)
+    if kernel is None:
+        try:
+            import numba
+        except ImportError:
+            raise ImportError("The numba movement backend needs Numba (pip install numba)") from None
+        kernel = _numba_kernels[function] = numba.njit(cache=True)(function)
+    return kernel
+
+
+def plan_moves_numba():
+    """_plan_moves_loop compiled with Numba, on first use."""
+    return _compiled(_plan_moves_loop)
+
+
+def claim_slots_numba():
+    """_claim_slots_loop compiled with Numba, on first use."""
+    return _compiled(_claim_slots_loop)
+
+
+def claim_slots(keys, valid, stays, priority, attempts):
+    """Settle which candidate slot every moving cell gets.
+
+    Cell i tries its candidates keys[i, 0], keys[i, 1], ... (at most attempts[i]),
+    one per round. A candidate is skipped if it isn't valid or if its slot was
+    claimed in an earlier round (unless stays: the cell's own slot). Of the cells
+    trying the same slot in a round the one with the lowest priority wins.
+    Returns the chosen column per cell, -1 for cells that don't move.
+    """
+    if MOVEMENT_BACKEND == "numba":
+        slot_count = (WORLD_WIDTH // CELL_SIZE + 1) * (WORLD_HEIGHT // CELL_SIZE + 1)
+        return claim_slots_numba()(keys, valid, stays, priority, attempts, slot_count)
+    return _claim_slots_numpy(keys, valid, stays, priority, attempts)
+
+
+def move_cells(cells, food_cells, spatial_grid, obstacles, occupied=()):
+    """Move all cells at once, the array version of Cell.move (MOVEMENT = "simultaneous").
+
+    Goals and targets are still picked per cell. Every moving cell then gets an
+    ordered list of candidate slots: the step towards its target, or the edge
+    escape followed by the four directions in random order. Candidates out of
+    bounds, in an obstacle or on a slot taken at the start of the tick are skipped.
+    Cells claiming the same slot are settled by a random priority and the losers
+    fall back to their next candidate. Positions are committed together, so the
+    outcome doesn't depend on the order of the cell list. occupied are cells that
+    don't move this tick; their slots are taken too.
+    """
+    global mating_attempts
+    n = len(cells)
+    if n == 0:
+        return
+    x = np.array([cell.x for cell in cells], dtype=np.float64)
+    y = np.array([cell.y for cell in cells], dtype=np.float64)
+    hp = np.array([cell.hp for cell in cells], dtype=np.float64)
+    hunger = np.array([cell.hunger for cell in cells], dtype=np.float64)
+    stamina = np.array([cell.stamina for cell in cells], dtype=np.float64)
+    speed = np.array([cell.speed for cell in cells], dtype=np.float64)
+    active = ~np.array([cell.is_mating for cell in cells], dtype=bool)
+
+    hp[active & (hunger <= 0)] -= 0.25
+    hp[active & (hunger >= 90)] += 1
+    thinking = active & (stamina >= 0)
+
+    # Goals and targets, per cell (they see each other's updated hp)
+    has_target = np.zeros(n, dtype=bool)
+    target_x = np.zeros(n)
+    target_y = np.zeros(n)
+    for i in np.flatnonzero(active).tolist():
+        cells[i].hp = float(hp[i])
+    for i in np.flatnonzero(thinking).tolist():
+        cell = cells[i]
+        goal = cell.choose_goal()
+        if goal == GOAL_MATE:
+            mating_attempts += 1
+            if mating_attempts % 10 == 0:  # Only print every 10th attempt to avoid spam
+                print(f"Cell looking for mate (attempt #{mating_attempts}) - Hunger: {cell.hunger:.1f}, HP: {cell.hp:.1f}, Stamina: {cell.stamina:.1f}")
+        target = cell.current_target(goal, food_cells, spatial_grid)
+        if target:
+            has_target[i] = True
+            target_x[i] = target.x
+            target_y[i] = target.y
+
+    # Random draws first, in the same order for every backend
+    escape_roll = rng.random(n)
+    order = np.argsort(rng.random((n, 4)), axis=1)
+    direction_x = np.array([cell.direction_x for cell in cells], dtype=np.float64)
+    direction_y = np.array([cell.direction_y for cell in cells], dtype=np.float64)
+    candidate_x, candidate_y, valid, candidate_dx, candidate_dy, attempts, wander = plan_moves(
+        x, y, hunger, stamina, speed, active, thinking, has_target, target_x, target_y,
+        direction_x, direction_y, escape_roll, order)
+
+    valid &= ((candidate_x >= 0) & (candidate_x < WORLD_WIDTH) &
+              (candidate_y >= 0) & (candidate_y < WORLD_HEIGHT))
+    valid &= ~blocked_by_obstacles(candidate_x, candidate_y, obstacles)
+    own = slot_keys(x, y)
+    taken = own
+    if occupied:
+        taken = np.concatenate([own, slot_keys(np.array([cell.x for cell in occupied], dtype=np.float64),
+                                               np.array([cell.y for cell in occupied], dtype=np.float64))])
+    keys = slot_keys(np.clip(candidate_x, 0, WORLD_WIDTH), np.clip(candidate_y, 0, WORLD_HEIGHT))
+    stays = keys == own[:, None]
+    valid &= stays | ~np.isin(keys, taken)
+    chosen = claim_slots(keys, valid, stays, rng.random(n), attempts)
+
+    moved = np.flatnonzero(chosen >= 0)
+    column = chosen[moved]
+    old_x, old_y = x.copy(), y.copy()
+    x[moved] = candidate_x[moved, column]
+    y[moved] = candidate_y[moved, column]
+    wandered = moved[wander[moved]]
+    direction_x[wandered] = candidate_dx[wandered, chosen[wandered]]
+    direction_y[wandered] = candidate_dy[wandered, chosen[wandered]]
+
+    for cell, *values in zip(cells, x.tolist(), y.tolist(), hp.tolist(), hunger.tolist(), stamina.tolist(),
+                             direction_x.tolist(), direction_y.tolist()):
+        cell.x, cell.y, cell.hp, cell.hunger, cell.stamina, cell.direction_x, cell.direction_y = values
+    for i in moved.tolist():
+        spatial_grid.move(cells[i], old_x[i], old_y[i])
+
+
+def step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick, respawn=True, batched=False):
+    """Advance the simulation by one tick. Does not draw anything.
+
+    respawn=False leaves food spawning to the caller (see ChunkedWorld).
+    batched=True also leaves the status update and the food despawn to the caller,
+    which runs them for many worlds at once (see EnsembleEngine).
+
+    The status update (ageing, hunger, mortality) runs last, for every cell at
+    once, after all movement, eating, mating and births of the tick.
+    """
+    global food_despawned_count
+    cell_size = CELL_SIZE  # Locals for the per-cell loops
+    get_nearby = spatial_grid.get_nearby
+    sequential = MOVEMENT == "sequential"
+    # Only awake cells go through movement, sensing and eating. Mating and
+    # exhausted cells are dormant until their state changes: they just count
+    # down the pair's timer or regain stamina.
+    awake = [cell for cell in cells if not cell.is_mating and cell.stamina >= 0]
+    if not sequential:
+        dormant = [cell for cell in cells if cell.is_mating or cell.stamina < 0]
+        move_cells(awake, food_cells, spatial_grid, obstacles, occupied=dormant)
+    awake = set(map(id, awake))
+    finished_pairs = []  # Pairs whose mating timer ran out this tick, see resolve_births
     for cell in cells:
-        spatial_grid.add(cell)
+        if cell.is_mating:
+            partner = cell.partner
+            if partner is None or partner.hp <= 0:
+                cell.leave_partner()
+            elif cell.mate(partner):
+                finished_pairs.append((cell, partner))
+        elif id(cell) not in awake:
+            cell.rest()
+        else:
+            if sequential:
+                cell.move(food_cells, spatial_grid, obstacles)
 
-    def draw_obstacles(screen, obstacles):
-        for obstacle in obstacles:
-            pygame.draw.rect(screen, GRAY, (obstacle.x, obstacle.y, obstacle.width, obstacle.height))
+            # Improved food eating logic - check for food at cell position
+            food_to_remove = None
+            cell_x, cell_y = cell.x, cell.y
+            for food in food_cells:
+                # Check if cell is at the same grid position as food
+                if (abs(cell_x - food.x) < cell_size and
+                    abs(cell_y - food.y) < cell_size and
+                    food.x != -1 and food.y != -1):
+                    food_to_remove = food
+                    break
 
+            if food_to_remove:
+                cell.eat(food_to_remove, food_cells)
+
+            for other in get_nearby(cell_x, cell_y, cell_size):  # Only adjacent cells can mate
+                if cell != other and abs(cell_x - other.x) <= cell_size and abs(cell_y - other.y) <= cell_size:
+                    # Only allow mating if both cells meet the relaxed conditions
+                    if (not cell.is_mating and not other.is_mating and
+                        cell.mating_cooldown == 0 and other.mating_cooldown == 0 and
+                        cell.hunger >= 70 and other.hunger >= 70 and
+                        cell.hp >= 70 and other.hp >= 70 and
+                        cell.stamina >= 50 and other.stamina >= 50):
+                        cell.start_mating(other)
+                        break
+        if cell.hp <= 0:
+            spatial_grid.remove(cell)
+            cells.remove(cell)
+            lineage.record_death(cell.id, current_tick)
+
+    cells.extend(resolve_births(finished_pairs, cells, spatial_grid, obstacles, current_tick))
+    if not batched:
+        remove_dead_cells(cells, update_status_batch(cells), spatial_grid, current_tick)
+        if respawn:
+            respawn_food(food_cells, obstacles, current_tick)
+
+        # Despawn old food
+        food_to_despawn = []
+        for food in food_cells:
+            if food.should_despawn(current_tick):
+                food_to_despawn.append(food)
+        for food in food_to_despawn:
+            food_cells.remove(food)
+            food.consume()
+            food_despawned_count += 1
+        if len(food_to_despawn) > 0:
+            print(f"Despawned {len(food_to_despawn)} old food cells")
+
+    if current_tick % LINEAGE_PRUNE_INTERVAL == 0:
+        lineage.prune()
+    if GRID_ADAPT_INTERVAL and current_tick % GRID_ADAPT_INTERVAL == 0 and spatial_grid.adapt():
+        print(f"Spatial grid rebuilt with {spatial_grid.cell_size}px buckets")
+
+
+def cell_color(cell):
+    if cell.is_mating:
+        return HOT_PINK
+    elif cell.stamina == 0 and cell.hunger >= 10:
+        return RED
+    elif cell.hunger > 90:
+        return CYAN
+    elif cell.mating_cooldown >= 1:
+        return PINK
+    elif cell.stamina <= 20:
+        return YELLOW
+    elif cell.hunger >= 90 and cell.stamina >= 75:
+        return BLUE
+    elif cell.stamina <= 15 and cell.hunger <= 30:
+        return ORANGE
+    elif cell.age >= 400:
+        return GRAY
+    return WHITE
+
+
+def food_color(food, current_tick):
+    # Calculate food age for visual feedback
+    food_age = current_tick - food.spawn_tick
+    age_ratio = min(food_age / FOOD_DESPAWN_TIME, 1.0)
+
+    # Food gets more faded as it gets older
+    if age_ratio > 0.8:  # Very old food - red tint
+        return (int(255 * (1 - age_ratio)), 255, int(255 * (1 - age_ratio)))
+    elif age_ratio > 0.6:  # Old food - yellow tint
+        return (255, 255, int(255 * (1 - age_ratio * 0.5)))
+    return GREEN  # Fresh food - normal green
+
+
+class Camera:
+    """Which part of the world is shown in the SCREEN_WIDTH x SCREEN_HEIGHT view, and how large."""
+
+    MIN_ZOOM = 0.05
+    MAX_ZOOM = 8.0
+
+    def __init__(self, view_width=SCREEN_WIDTH, view_height=SCREEN_HEIGHT):
+        self.view_width = view_width
+        self.view_height = view_height
+        self.x = 0.0  # World position of the top left corner of the view
+        self.y = 0.0
+        self.zoom = 1.0  # Screen pixels per world pixel
+
+    def world_to_screen(self, x, y):
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+
+    def screen_to_world(self, x, y):
+        return x / self.zoom + self.x, y / self.zoom + self.y
+
+    def visible_rect(self):
+        """(x0, y0, x1, y1) of the world area in view."""
+        return self.x, self.y, self.x + self.view_width / self.zoom, self.y + self.view_height / self.zoom
+
+    def zoom_at(self, factor, screen_x, screen_y):
+        """Zoom by factor, keeping the world point under (screen_x, screen_y) in place."""
+        world_x, world_y = self.screen_to_world(screen_x, screen_y)
+        self.zoom = max(self.MIN_ZOOM, min(self.zoom * factor, self.MAX_ZOOM))
+        self.x = world_x - screen_x / self.zoom
+        self.y = world_y - screen_y / self.zoom
+
+    def pan(self, screen_dx, screen_dy):
+        self.x -= screen_dx / self.zoom
+        self.y -= screen_dy / self.zoom
+
+    def reset(self):
+        """Zoom 1:1 on the top left of the world, or fit the whole world if it is bigger than the view."""
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom = min(1.0, self.view_width / WORLD_WIDTH, self.view_height / WORLD_HEIGHT)
+
+
+def draw_heatmap(screen, food_cells, camera, spatial_grid):
+    """Draw cell (red) and food (green) density per grid bucket, for zoomed-out views."""
+    import pygame
+    cell_size = spatial_grid.cell_size
+    cell_counts = spatial_grid.counts()
+    food_x = np.fromiter((food.x for food in food_cells), dtype=np.int64, count=len(food_cells))
+    food_y = np.fromiter((food.y for food in food_cells), dtype=np.int64, count=len(food_cells))
+    placed = food_x >= 0  # Eaten food waits at (-1, -1)
+    food_counts = np.bincount((food_x[placed] // cell_size) * spatial_grid.height + food_y[placed] // cell_size,
+                              minlength=cell_counts.size).reshape(cell_counts.shape)
+
+    # Only the buckets in view, so the scaled surface stays about as big as the screen
+    x0, y0, x1, y1 = camera.visible_rect()
+    i0 = max(0, int(x0 // cell_size))
+    j0 = max(0, int(y0 // cell_size))
+    i1 = min(spatial_grid.width, int(x1 // cell_size) + 1)
+    j1 = min(spatial_grid.height, int(y1 // cell_size) + 1)
+    if i0 >= i1 or j0 >= j1:
+        return
+
+    pixels = np.zeros((i1 - i0, j1 - j0, 3), dtype=np.uint8)
+    # LOD_SATURATION is per GRID_CELL_SIZE bucket, the grid may use another size
+    scale = 255 / LOD_SATURATION * (GRID_CELL_SIZE / cell_size) ** 2
+    pixels[..., 0] = np.minimum(cell_counts[i0:i1, j0:j1] * scale, 255)
+    pixels[..., 1] = np.minimum(food_counts[i0:i1, j0:j1] * scale, 255)
+    heatmap = pygame.surfarray.make_surface(pixels)
+    left, top = camera.world_to_screen(i0 * cell_size, j0 * cell_size)
+    right, bottom = camera.world_to_screen(i1 * cell_size, j1 * cell_size)
+    heatmap = pygame.transform.scale(heatmap, (math.ceil(right - left), math.ceil(bottom - top)))
+    screen.blit(heatmap, (left, top))
+
+
+_obstacle_background = (None, None)  # (ObstacleMap, its pre-rendered surface)
+
+
+def draw_obstacles(screen, obstacles, camera):
+    """Draw the obstacles inside the camera view from a surface rendered once per map, one pixel per grid slot."""
+    import pygame
+    global _obstacle_background
+    owner, background = _obstacle_background
+    if owner is not obstacles:
+        colors = np.zeros(obstacles.walkable.shape + (3,), dtype=np.uint8)
+        colors[~obstacles.walkable] = GRAY
+        background = pygame.surfarray.make_surface(colors)
+        background.set_colorkey(BLACK)
+        _obstacle_background = (obstacles, background)
+
+    x0, y0, x1, y1 = camera.visible_rect()
+    columns, rows = obstacles.walkable.shape
+    i0, j0 = max(int(x0 // CELL_SIZE), 0), max(int(y0 // CELL_SIZE), 0)
+    i1, j1 = min(math.ceil(x1 / CELL_SIZE), columns), min(math.ceil(y1 / CELL_SIZE), rows)
+    if i0 >= i1 or j0 >= j1:
+        return
+    left, top = camera.world_to_screen(i0 * CELL_SIZE, j0 * CELL_SIZE)
+    right, bottom = camera.world_to_screen(i1 * CELL_SIZE, j1 * CELL_SIZE)
+    visible = pygame.transform.scale(background.subsurface((i0, j0, i1 - i0, j1 - j0)),
+                                     (math.ceil(right - left), math.ceil(bottom - top)))
+    screen.set_clip((0, 0, camera.view_width, camera.view_height))
+    screen.blit(visible, (left, top))
+    screen.set_clip(None)
+
+
+def draw_world(screen, cells, food_cells, current_tick, debug_overlay, camera, spatial_grid):
+    """Draw the cells (plus the debug overlay, if given) and food inside the camera view.
+
+    Zoomed out past LOD_ZOOM_THRESHOLD only a density heatmap is drawn.
+    """
+    import pygame
+    screen.set_clip((0, 0, camera.view_width, camera.view_height))
+    if camera.zoom < LOD_ZOOM_THRESHOLD:
+        draw_heatmap(screen, food_cells, camera, spatial_grid)
+        screen.set_clip(None)
+        return
+
+    x0, y0, x1, y1 = camera.visible_rect()
+    # Anything touching the view, including cells partly off its top/left edge
+    x0 -= CELL_SIZE
+    y0 -= CELL_SIZE
+    zoom = camera.zoom
+    size = max(1, math.ceil(CELL_SIZE * zoom))
+
+    visible = [cell for cell in spatial_grid.get_in_rect(x0, y0, x1, y1) if x0 < cell.x < x1 and y0 < cell.y < y1]
+    for cell in visible:
+        pygame.draw.rect(screen, cell_color(cell),
+                         ((cell.x - camera.x) * zoom, (cell.y - camera.y) * zoom, size, size))
+
+    for food in food_cells:
+        if x0 < food.x < x1 and y0 < food.y < y1:
+            pygame.draw.rect(screen, food_color(food, current_tick),
+                             ((food.x - camera.x) * zoom, (food.y - camera.y) * zoom, size, size))
+
+    if debug_overlay:
+        debug_overlay.draw(screen, visible, camera, pygame.mouse.get_pos())
+
+    screen.set_clip(None)
+
+
+# Checkpoints
+#
+# A checkpoint is an uncompressed .npz archive holding one column per
+# attribute, so saving and loading are a handful of bulk array copies.
+
+CHECKPOINT_VERSION = 13
+CHECKPOINT_PATH = "checkpoint.npz"
+
+# Autosave
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOTS_TO_KEEP = 5
+
+# Trajectory export
+TRAJECTORY_DIR = "trajectories"
+TRAJECTORY_INTERVAL = 10
+TRAJECTORY_CHUNK_ROWS = 250000
+TRAJECTORY_FLOAT_FIELDS = ("x", "y", "hp", "hunger", "stamina")
+TRAJECTORY_INT_FIELDS = ("id", "age", "generation", "speed", "max_hp", "max_stamina", "max_hunger")
+
+# Chunked worlds
+CHUNK_HALO = GRID_CELL_SIZE * 2  # Width of the border strip shared with neighbouring chunks
+CHUNK_ID_SPACING = 2 ** 40  # Each chunk hands out cell ids from its own range
+# Globals set from the command line that worker processes get from the coordinator
+# (a spawned worker imports this module afresh); the SimulationConfig goes along too
+WORKER_SETTINGS = ("WORLD_WIDTH", "WORLD_HEIGHT", "MOVEMENT_BACKEND", "OBSTACLE_MAP")
+
+# Ensembles
+ENSEMBLE_METRICS = ("cells", "food", "max_generation")  # Per world and tick, see EnsembleEngine
+ENSEMBLE_PATH = "ensemble.npz"
+
+# Control server
+CONTROL_METRICS_INTERVAL = 10  # Default ticks between metrics messages to a subscriber
+CONTROL_MAX_BUFFER = 2 ** 20  # Bytes waiting for a slow subscriber before its metrics are dropped
+CONTROL_IDLE_SLEEP = 0.05  # Seconds between command checks while a headless run is paused
+
+# Replays
+REPLAY_KEYFRAME_INTERVAL = 500
+REPLAY_SEEK_STEP = 500  # Ticks skipped by the [ and ] keys in the replay viewer
+
+CELL_FLOAT_FIELDS = ("hp", "hunger", "stamina", "x", "y", "mortality_chance", "direction_x", "direction_y")
+CELL_INT_FIELDS = ("id", "mating_cooldown", "mating_timer", "age", "generation", "goal", "goal_age")
+CELL_BOOL_FIELDS = ("is_mating", "is_dead")
+# Everything capture_state reads from a cell, in the order freeze_state copies it
+CELL_ROW_FIELDS = CELL_FLOAT_FIELDS + CELL_INT_FIELDS + CELL_BOOL_FIELDS + ("genome", "target", "partner")
+FOOD_FIELDS = ("x", "y", "spawn_tick")
+OBSTACLE_FIELDS = ("x", "y", "width", "height")
+
+
+def _columns(objects, names, dtype):
+    count = len(objects)
+    return {field: np.fromiter(map(attrgetter(field), objects), dtype=dtype, count=count) for field in names}
+
+
+def _objects_from_columns(cls, columns, names):
+    """Rebuild objects from saved columns without going through __init__."""
+    values = [columns[field].tolist() for field in names]
+    objects = []
+    new = cls.__new__
+    setters = [getattr(cls, field).__set__ for field in names]
+    for row in zip(*values):
+        obj = new(cls)
+        for setter, value in zip(setters, row):
+            setter(obj, value)
+        objects.append(obj)
+    return objects
+
+
+def _row_columns(rows, names):
+    """{field: tuple of values} for rows of attrgetter(*names) tuples."""
+    if not rows:
+        return {field: () for field in names}
+    return dict(zip(names, zip(*rows)))
+
+
+def capture_state(cells, food_cells, obstacles, spatial_grid):
+    """Copy the full simulation state into a dict of NumPy arrays."""
+    state = _run_state(spatial_grid)
+    # Straight from the objects: a column per attribute, no tuple per object in between
+    with gc_paused():
+        _fill_columns(state, cells, {field: list(map(attrgetter(field), cells)) for field in CELL_ROW_FIELDS},
+                      food_cells, {field: list(map(attrgetter(field), food_cells)) for field in FOOD_FIELDS},
+                      {field: list(map(attrgetter(field), obstacles)) for field in OBSTACLE_FIELDS})
+    return state
+
+
+def _column_array(values, dtype):
+    return np.fromiter(values, dtype=dtype, count=len(values))
+
+
+def freeze_state(cells, food_cells, obstacles, spatial_grid):
+    """The part of capture_state that has to run between ticks.
+
+    Cells, food and obstacles are only copied as tuples of their attribute
+    values; complete_state() turns those into columns later, on any thread.
+    """
+    state = _run_state(spatial_grid)
+    # The lists are copied along so the ids that targets and partners are matched by stay valid
+    with gc_paused():  # Most of the cost of a million tuples is the collector looking at them
+        state["rows"] = (list(cells), list(map(attrgetter(*CELL_ROW_FIELDS), cells)),
+                         list(food_cells), list(map(attrgetter(*FOOD_FIELDS), food_cells)),
+                         list(map(attrgetter(*OBSTACLE_FIELDS), obstacles)))
+    return state
+
+
+def _run_state(spatial_grid):
+    """Everything in a checkpoint apart from the cell, food and obstacle columns."""
+    state = {"version": np.array(CHECKPOINT_VERSION)}
+    state["world_size"] = np.array([WORLD_WIDTH, WORLD_HEIGHT])
+
+    # Only the bucket size: neighbour searches don't depend on the order inside the
+    # buckets (see get_nearby), so the grid is rebuilt from the cell positions on load
+    state["grid_cell_size"] = np.array(spatial_grid.cell_size)
+
+    state["mating_attempts"] = np.array(mating_attempts)
+    state["mating_successes"] = np.array(mating_successes)
+    state["food_despawned_count"] = np.array(food_despawned_count)
+    state["next_cell_id"] = np.array(next_cell_id)
+    state["food_patches"] = food_patches
+    state["decision_period"] = np.array(DECISION_PERIOD)
+    state["config"] = np.array(json.dumps(asdict(SimulationConfig.current())))
+
+    rng_version, rng_internal, rng_gauss_next = random.getstate()
+    state["rng_version"] = np.array(rng_version)
+    state["rng_internal"] = np.array(rng_internal, dtype=np.uint32)
+    state["rng_gauss_next"] = np.array(np.nan if rng_gauss_next is None else rng_gauss_next)
+
+    for name, column in lineage.get_state().items():
+        state["lineage_" + name] = column
+
+    state["numpy_rng_state"] = np.array(json.dumps(rng.bit_generator.state))
+
+    state["live_cells_history"] = np.array(live_cells_history, dtype=np.int64)
+    state["food_cells_history"] = np.array(food_cells_history, dtype=np.int64)
+    state["highest_generation_history"] = np.array(highest_generation_history, dtype=np.int64)
+    state["ticks"] = np.array(ticks, dtype=np.int64)
+    return state
+
+
+def complete_state(state):
+    """Turn a state from freeze_state into the dict of arrays capture_state returns (in place)."""
+    cells, cell_rows, food_cells, food_rows, obstacle_rows = state.pop("rows")
+    with gc_paused():
+        _fill_columns(state, cells, _row_columns(cell_rows, CELL_ROW_FIELDS),
+                      food_cells, _row_columns(food_rows, FOOD_FIELDS),
+                      _row_columns(obstacle_rows, OBSTACLE_FIELDS))
+    return state
+
+
+def _indices_of(objects, wanted):
+    """Position of each object of wanted in objects (by identity), -1 if it isn't there."""
+    if not objects:
+        return np.full(len(wanted), -1, dtype=np.int64)
+    ids = np.fromiter(map(id, objects), dtype=np.int64, count=len(objects))
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+    wanted_ids = np.fromiter(map(id, wanted), dtype=np.int64, count=len(wanted))
+    positions = np.minimum(np.searchsorted(sorted_ids, wanted_ids), len(ids) - 1)
+    return np.where(sorted_ids[positions] == wanted_ids, order[positions], -1)
+
+
+def _fill_columns(state, cells, columns, food_cells, food_columns, obstacle_columns):
+    """Add the cell, food and obstacle columns to state; columns map each field to its values."""
+    for names, dtype in ((CELL_FLOAT_FIELDS, np.float64), (CELL_INT_FIELDS, np.int64), (CELL_BOOL_FIELDS, np.bool_)):
+        for field in names:
+            state["cell_" + field] = _column_array(columns[field], dtype)
+    # Traits aren't stored, they are expressed from the genome again on load
+    state["cell_genome"] = unpack_genomes(columns["genome"])
+
+    # Cached targets and mating partners are stored as an index into the food or cell list
+    goals = state["cell_goal"]
+    targets = np.full(len(cells), -1, dtype=np.int64)
+    partners = np.full(len(cells), -1, dtype=np.int64)
+    has_target = np.fromiter((target is not None for target in columns["target"]), dtype=np.bool_, count=len(cells))
+    for in_food, objects in ((True, food_cells), (False, cells)):
+        rows = np.flatnonzero(has_target & ((goals == GOAL_FOOD) == in_food))
+        targets[rows] = _indices_of(objects, [columns["target"][i] for i in rows.tolist()])
+    # Target is gone for good; the next decision searches again either way
+    goals[has_target & (targets < 0)] = GOAL_NONE
+    rows = [i for i, partner in enumerate(columns["partner"]) if partner is not None]
+    # A partner that died this tick stays -1, the survivor notices either way
+    partners[rows] = _indices_of(cells, [columns["partner"][i] for i in rows])
+    state["cell_target"] = targets
+    state["cell_partner"] = partners
+
+    for prefix, table, names in (("food_", food_columns, FOOD_FIELDS), ("obstacle_", obstacle_columns, OBSTACLE_FIELDS)):
+        for field in names:
+            state[prefix + field] = _column_array(table[field], np.int64)
+
+
+def restore_state(state):
+    """Rebuild the simulation from a dict produced by capture_state.
+
+    Restores counters, histories and the RNG in place and returns
+    (cells, food_cells, obstacles, spatial_grid).
+    """
+    global mating_attempts, mating_successes, food_despawned_count, next_cell_id, WORLD_WIDTH, WORLD_HEIGHT, food_patches
+    global DECISION_PERIOD
+    version = int(state["version"])
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {version} (expected {CHECKPOINT_VERSION})")
+    WORLD_WIDTH, WORLD_HEIGHT = state["world_size"].tolist()
+
+    with gc_paused():
+        cells = Cell.from_columns({field: state["cell_" + field].tolist()
+                                   for field in CELL_FLOAT_FIELDS + CELL_INT_FIELDS + CELL_BOOL_FIELDS},
+                                  state["cell_genome"])
+        food_cells = Food.from_columns({field: state["food_" + field].tolist() for field in FOOD_FIELDS})
+        spatial_grid = build_spatial_grid(cells, int(state["grid_cell_size"]))
+    targets = state["cell_target"]
+    for i in np.flatnonzero(targets >= 0).tolist():
+        cell = cells[i]
+        cell.target = food_cells[targets[i]] if cell.goal == GOAL_FOOD else cells[targets[i]]
+    partners = state["cell_partner"]
+    for i in np.flatnonzero(partners >= 0).tolist():
+        cells[i].partner = cells[partners[i]]
+    obstacles = ObstacleMap(_objects_from_columns(Obstacle, {f: state["obstacle_" + f] for f in OBSTACLE_FIELDS},
+                                                  OBSTACLE_FIELDS))
+
+    mating_attempts = int(state["mating_attempts"])
+    mating_successes = int(state["mating_successes"])
+    food_despawned_count = int(state["food_despawned_count"])
+    next_cell_id = int(state["next_cell_id"])
+    food_patches = state["food_patches"]
+    DECISION_PERIOD = int(state["decision_period"])
+    apply_config(SimulationConfig(**json.loads(str(state["config"]))))
+
+    gauss_next = float(state["rng_gauss_next"])
+    random.setstate((
+        int(state["rng_version"]),
+        tuple(state["rng_internal"].tolist()),
+        None if math.isnan(gauss_next) else gauss_next,
+    ))
+
+    lineage.set_state({name: state["lineage_" + name] for name in LineageStore.COLUMNS})
+
+    rng.bit_generator.state = json.loads(str(state["numpy_rng_state"]))
+
+    # Histories are updated in place so references held elsewhere stay valid
+    live_cells_history[:] = state["live_cells_history"].tolist()
+    food_cells_history[:] = state["food_cells_history"].tolist()
+    highest_generation_history[:] = state["highest_generation_history"].tolist()
+    ticks[:] = state["ticks"].tolist()
+    return cells, food_cells, obstacles, spatial_grid
+
+
+def save_checkpoint(path, cells, food_cells, obstacles, spatial_grid):
+    np.savez(path, **capture_state(cells, food_cells, obstacles, spatial_grid))
+    print(f"Saved checkpoint to {path} ({len(cells)} cells, {len(food_cells)} food)")
+
+
+def latest_snapshot(directory):
+    """Return the newest snapshot in directory, or None if there is none."""
+    snapshots = SnapshotWriter.list_snapshots(directory)
+    return snapshots[-1] if snapshots else None
+
+
+def load_checkpoint(path):
+    if os.path.isdir(path):
+        snapshot = latest_snapshot(path)
+        if snapshot is None:
+            raise FileNotFoundError(f"No snapshots found in {path}")
+        path = snapshot
+    with np.load(path) as archive:
+        state = {name: archive[name] for name in archive.files}
+    cells, food_cells, obstacles, spatial_grid = restore_state(state)
+    print(f"Loaded checkpoint from {path} ({len(cells)} cells, {len(food_cells)} food, tick {len(ticks)})")
+    return cells, food_cells, obstacles, spatial_grid
+
+
+class SnapshotWriter:
+    """Autosaves the simulation every `interval` ticks without stalling the tick loop.
+
+    The calling thread only takes freeze_state(), attribute tuples and copies of
+    the small state; the background thread turns that into arrays, compresses
+    and writes it. Only the newest `keep` snapshots are kept (all of them if keep is None).
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, interval=1000, keep=SNAPSHOTS_TO_KEEP):
+        self.directory = directory
+        self.interval = interval
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        # Room for a single pending snapshot: if the writer falls behind we skip
+        # autosaves instead of piling up copies of the world in memory.
+        self.pending = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def list_snapshots(directory):
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(name for name in os.listdir(directory)
+                       if name.startswith("snapshot_") and name.endswith(".npz"))
+        return [os.path.join(directory, name) for name in names]
+
+    @staticmethod
+    def snapshot_tick(path):
+        return int(os.path.basename(path)[len("snapshot_"):-len(".npz")])
+
+    def snapshot(self, current_tick, cells, food_cells, obstacles, spatial_grid):
+        """Queue a snapshot right away, waiting for the writer if it is busy."""
+        self.pending.put((current_tick, freeze_state(cells, food_cells, obstacles, spatial_grid)))
+
+    def maybe_snapshot(self, current_tick, cells, food_cells, obstacles, spatial_grid):
+        if self.interval <= 0 or current_tick % self.interval != 0:
+            return False
+        # Checked before freeze_state, so a skipped autosave costs the tick nothing.
+        # The tick thread is the only producer, so the slot can't fill up in between.
+        if self.pending.full():
+            print(f"Snapshot writer is busy, skipped autosave at tick {current_tick}")
+            return False
+        self.pending.put_nowait((current_tick, freeze_state(cells, food_cells, obstacles, spatial_grid)))
+        return True
+
+    def _run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            current_tick, state = item
+            path = os.path.join(self.directory, f"snapshot_{current_tick:09d}.npz")
+            # Write under a temporary name so a crash never leaves a truncated snapshot behind
+            tmp_path = path + ".tmp"
+            try:
+                state = complete_state(state)
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **state)
+                os.replace(tmp_path, path)
+                self._prune()
+            except Exception as e:
+                # Not only OSError: a dead writer thread would make snapshot() and close() wait forever
+                print(f"Could not write snapshot {path}: {e!r}")
+
+    def _prune(self):
+        if self.keep is None:
+            return
+        snapshots = self.list_snapshots(self.directory)
+        for path in snapshots[:max(0, len(snapshots) - self.keep)]:
+            os.remove(path)
+
+    def close(self):
+        """Wait for the pending snapshot (if any) to be written and stop the thread."""
+        self.pending.put(None)
+        self.thread.join()
+
+
+class TrajectoryExporter:
+    """Streams per-cell columns every `interval` ticks to chunked columnar files.
+
+    Columns are gathered on the tick thread; buffering and writing happen on a
+    background thread. Each chunk file holds about `chunk_rows` rows, as .npz or,
+    when pyarrow is installed, .parquet.
+    """
+
+    def __init__(self, directory=TRAJECTORY_DIR, interval=TRAJECTORY_INTERVAL,
+                 chunk_rows=TRAJECTORY_CHUNK_ROWS, file_format="npz"):
+        if file_format == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from None
+        self.directory = directory
+        self.interval = interval
+        self.chunk_rows = chunk_rows
+        self.file_format = file_format
+        self.chunk_index = 0
+        os.makedirs(directory, exist_ok=True)
+        # Bounded so memory stays bounded: if the writer falls far behind, the
+        # tick loop waits for it rather than dropping rows.
+        self.pending = queue.Queue(maxsize=8)
+        self.thread = threading.Thread(target=self._run, name="trajectory-exporter", daemon=True)
+        self.thread.start()
+
+    def maybe_export(self, current_tick, cells):
+        if self.interval <= 0 or current_tick % self.interval != 0 or not cells:
+            return
+        columns = {"tick": np.full(len(cells), current_tick, dtype=np.int64)}
+        columns.update(_columns(cells, TRAJECTORY_INT_FIELDS, np.int64))
+        columns.update(_columns(cells, TRAJECTORY_FLOAT_FIELDS, np.float32))
+        self.pending.put(columns)
+
+    def _run(self):
+        buffered = []
+        buffered_rows = 0
+        while True:
+            columns = self.pending.get()
+            if columns is not None:
+                buffered.append(columns)
+                buffered_rows += len(columns["tick"])
+            if buffered and (columns is None or buffered_rows >= self.chunk_rows):
+                self._write_chunk(buffered)
+                buffered = []
+                buffered_rows = 0
+            if columns is None:
+                break
 
+    def _write_chunk(self, buffered):
+        path = os.path.join(self.directory, f"trajectory_{self.chunk_index:05d}.{self.file_format}")
+        try:
+            columns = {name: np.concatenate([c[name] for c in buffered]) for name in buffered[0]}
+            if self.file_format == "parquet":
+                import pyarrow
+                import pyarrow.parquet
+                pyarrow.parquet.write_table(pyarrow.table(columns), path)
+            else:
+                np.savez_compressed(path, **columns)
+        except Exception as e:
+            # Not only OSError: a dead writer thread would leave maybe_export blocked on a full queue
+            print(f"Could not write trajectory chunk {path}: {e!r}")
+        self.chunk_index += 1
+
+    def close(self):
+        """Write out the remaining rows and stop the thread."""
+        self.pending.put(None)
+        self.thread.join()
+
+
+def new_world():
+    global food_patches
+    if OBSTACLE_MAP:
+        obstacles = load_obstacle_map(OBSTACLE_MAP)
+    else:
+        obstacles = generate_random_obstacles(NUM_OBSTACLES, MAX_OBSTACLE_WIDTH, MAX_OBSTACLE_HEIGHT)
+    food_patches = random_food_patches()
     cells, food_cells = reset_simulation(NUM_INITIAL_CELLS, NUM_INITIAL_FOOD, obstacles)
-    spatial_grid = SpatialGrid(SCREEN_WIDTH, SCREEN_HEIGHT, GRID_CELL_SIZE)
-    for cell in cells:
+    return cells, food_cells, obstacles
+
+
+def apply_input(event, cells, food_cells, obstacles, spatial_grid):
+    """Apply an external input (hotkey or draw mode click) to the simulation.
+
+    Every input that changes the outcome of a run goes through here, so a replay
+    can feed the same events back in. Returns the (possibly replaced) world as
+    (cells, food_cells, obstacles, spatial_grid).
+    """
+    global MIN_FOOD_CELLS, FOOD_RESPAWN_RATE, DECISION_PERIOD
+    kind = event["kind"]
+    if kind == "spawn_cell":
+        cell = Cell(event["x"], event["y"])
+        lineage.record_births([cell], len(ticks))
+        cells.append(cell)
         spatial_grid.add(cell)
+        print("Spawned Cell")
+    elif kind == "spawn_food":
+        food_cells.append(Food(event["x"], event["y"], len(ticks)))
+        print("Spawned Food.")
+    elif kind == "set_min_food_cells":
+        MIN_FOOD_CELLS = event["value"]
+        print(f"Minimum food cells set to: {MIN_FOOD_CELLS}")
+    elif kind == "set_food_respawn_rate":
+        FOOD_RESPAWN_RATE = event["value"]
+        print(f"Food respawn rate set to: {FOOD_RESPAWN_RATE}")
+    elif kind == "set_decision_period":
+        DECISION_PERIOD = event["value"]
+        print(f"Decision period set to {DECISION_PERIOD} ticks")
+    elif kind == "set_config":
+        apply_config(replace(SimulationConfig.current(), **event["values"]))
+        print(f"Config changed: {event['values']}")
+    elif kind == "reset":
+        cells, food_cells, obstacles = new_world()
+        spatial_grid = build_spatial_grid(cells)
+        reset_counters()
+        print("Reset grid and obstacles.")
+    else:
+        raise ValueError(f"Unknown input event: {kind}")
+    return cells, food_cells, obstacles, spatial_grid
+
+
+class DecisionScheduler:
+    """Keeps ticks within a time budget by spreading the target searches over several ticks.
+
+    observe() gets the duration of every tick. While the average is over budget
+    DECISION_PERIOD is doubled (up to DECISION_PERIOD_MAX), one step every
+    DECISION_SETTLE_TICKS. A step that doesn't cut the average by DECISION_MIN_GAIN
+    is undone and the period isn't raised that far again until it has relaxed:
+    past some point the ticks are spent on movement, not on target searches.
+    Once the average is well under budget the period shrinks by one again.
+    Changes are returned as "set_decision_period" input events, so they are
+    recorded for replays.
+    """
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.period = DECISION_PERIOD
+        self.ceiling = DECISION_PERIOD_MAX
+        self.average_ms = None
+        self.ticks_since_change = 0
+        self.before_raise = None  # (period, average_ms) until the last raise has been judged
+
+    def observe(self, elapsed_ms):
+        if self.average_ms is None:
+            self.average_ms = elapsed_ms
+        self.average_ms = 0.8 * self.average_ms + 0.2 * elapsed_ms
+        self.ticks_since_change += 1
+        if self.ticks_since_change < DECISION_SETTLE_TICKS:
+            return None
+        period = self.period
+        if self.before_raise is not None:
+            previous_period, previous_ms = self.before_raise
+            self.before_raise = None
+            if self.average_ms > previous_ms * (1 - DECISION_MIN_GAIN):
+                period = self.ceiling = previous_period
+        elif self.average_ms > self.budget_ms and period < self.ceiling:
+            self.before_raise = (period, self.average_ms)
+            period = min(period * 2, self.ceiling)
+        elif (period > 1 and self.ticks_since_change >= DECISION_RELAX_TICKS and
+              self.average_ms < self.budget_ms * DECISION_RELAX_THRESHOLD):
+            period -= 1
+            self.ceiling = DECISION_PERIOD_MAX
+        if period == self.period:
+            return None
+        self.period = period
+        self.ticks_since_change = 0
+        return {"kind": "set_decision_period", "value": period}
+
+
+class ControlServer:
+    """Local control and telemetry API, served by asyncio on a background thread.
+
+    address is "HOST:PORT" for a TCP server (keep it on localhost) or a path for
+    a Unix socket. Clients send one JSON object per line and get one reply line:
+      {"command": "pause"} / {"command": "resume"}
+      {"command": "set", "values": {"min_food_cells": 80, ...}}  (SimulationConfig fields)
+      {"command": "spawn_cell", "x": 100, "y": 200} / {"command": "spawn_food", ...}
+      {"command": "snapshot", "path": "file.npz"}  (path inside snapshot_dir, defaults to CHECKPOINT_PATH)
+      {"command": "subscribe", "every": 10} / {"command": "unsubscribe"}
+      {"command": "status"}
+    Subscribers then receive a metrics line every `every` ticks. Snapshots are
+    only written to snapshot_dir: absolute paths and ".." are refused.
+
+    Commands are checked on the server thread and put on a deque that the
+    simulation drains with poll() between ticks, so nothing waits on a client.
+    Changes to the world come out of poll() as input events for apply_input,
+    and are recorded like hotkeys. Metrics for slow subscribers are dropped
+    rather than buffered without limit.
+    """
+
+    def __init__(self, address, metrics_every=CONTROL_METRICS_INTERVAL, snapshot_dir=SNAPSHOT_DIR):
+        import asyncio
+        self.address = address
+        self.metrics_every = metrics_every
+        self.snapshot_dir = snapshot_dir
+        self.commands = deque()  # Appended by the server thread, drained by poll()
+        self.paused = False
+        self.tick = 0
+        self.subscribers = {}  # writer -> ticks between metrics, only touched on the server thread
+        self.intervals = ()  # Snapshot of the subscriber intervals for publish()
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        started = threading.Event()
+        error = []
+        self.thread = threading.Thread(target=self._run, args=(started, error), name="control-server", daemon=True)
+        self.thread.start()
+        started.wait()
+        if error:
+            raise error[0]
+        print(f"Control server listening on {address}")
+
+    def _run(self, started, error):
+        try:
+            self.server = self.loop.run_until_complete(self._start())
+        except OSError as e:
+            error.append(e)
+            return
+        finally:
+            started.set()
+        self.loop.run_forever()
+
+    async def _start(self):
+        import asyncio
+        host, _, port = self.address.rpartition(":")
+        if port.isdigit():
+            return await asyncio.start_server(self._serve, host or "127.0.0.1", int(port))
+        return await asyncio.start_unix_server(self._serve, self.address)
+
+    async def _serve(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = self._handle(json.loads(line), writer)
+                except (ValueError, TypeError, KeyError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # Client went away, or sent a line longer than the stream limit
+        finally:
+            if self.subscribers.pop(writer, None):
+                self.intervals = tuple(self.subscribers.values())
+            writer.close()
+
+    def _handle(self, request, writer):
+        """Check a request and queue it. Runs on the server thread."""
+        command = request["command"]
+        if command in ("pause", "resume"):
+            self.commands.append({"action": command})
+        elif command == "set":
+            values = request["values"]
+            replace(SimulationConfig(), **values)  # Raises on unknown names and wrong types
+            self.commands.append({"kind": "set_config", "values": values})
+        elif command in ("spawn_cell", "spawn_food"):
+            x, y = request["x"], request["y"]
+            if not (0 <= x < WORLD_WIDTH and 0 <= y < WORLD_HEIGHT):
+                raise ValueError(f"({x}, {y}) is outside the world")
+            self.commands.append({"kind": command, "x": int(x // CELL_SIZE) * CELL_SIZE,
+                                  "y": int(y // CELL_SIZE) * CELL_SIZE})
+        elif command == "snapshot":
+            path = self.snapshot_path(request.get("path", CHECKPOINT_PATH))
+            self.commands.append({"action": "snapshot", "path": path})
+        elif command == "subscribe":
+            every = int(request.get("every", self.metrics_every))
+            if every < 1:
+                raise ValueError("every must be at least 1")
+            self.subscribers[writer] = every
+            self.intervals = tuple(self.subscribers.values())
+        elif command == "unsubscribe":
+            self.subscribers.pop(writer, None)
+            self.intervals = tuple(self.subscribers.values())
+        elif command == "status":
+            return {"ok": True, "tick": self.tick, "paused": self.paused}
+        else:
+            raise ValueError(f"Unknown command: {command}")
+        return {"ok": True}
+
+    def snapshot_path(self, name):
+        """Where a client's snapshot goes; clients can't write outside snapshot_dir."""
+        if not isinstance(name, str) or not name or os.path.isabs(name):
+            raise ValueError(f"Snapshot path must be relative to {self.snapshot_dir}: {name!r}")
+        if ".." in name.replace("\\", "/").split("/"):
+            raise ValueError(f"Snapshot path must not contain '..': {name!r}")
+        path = os.path.join(self.snapshot_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def poll(self):
+        """Take the queued commands: input events (with "kind") and actions (with "action")."""
+        commands = []
+        while self.commands:
+            commands.append(self.commands.popleft())
+        for command in commands:
+            if command.get("action") in ("pause", "resume"):
+                self.paused = command["action"] == "pause"
+        return commands
+
+    def publish(self, current_tick, cells, food_cells):
+        """Hand this tick's metrics to the subscribers that are due. Called after every tick."""
+        self.tick = current_tick
+        if not any(current_tick % every == 0 for every in self.intervals):
+            return
+        metrics = {
+            "tick": current_tick,
+            "cells": len(cells),
+            "food": len(food_cells),
+            "max_generation": max((cell.generation for cell in cells), default=0),
+            "living_lineages": len(lineage.living_lineages()),
+        }
+        self.loop.call_soon_threadsafe(self._broadcast, current_tick, (json.dumps(metrics) + "\n").encode())
+
+    def _broadcast(self, current_tick, line):
+        for writer, every in self.subscribers.items():
+            if current_tick % every == 0 and writer.transport.get_write_buffer_size() < CONTROL_MAX_BUFFER:
+                writer.write(line)
+
+    def _shutdown(self):
+        import asyncio
+        self.server.close()
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()  # Client connections
+        self.loop.call_soon(self.loop.stop)  # After the cancelled tasks had a chance to finish
+
+    def close(self):
+        if self.server is None:
+            return
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join()
+        self.loop.close()
+        if not self.address.rpartition(":")[2].isdigit() and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class ReplayRecorder:
+    """Records a run so it can be replayed: the seed, every external input and periodic keyframes.
+
+    A recording is a directory with an `events.jsonl` log (header line first) and
+    keyframe checkpoints written by a SnapshotWriter.
+    """
+
+    def __init__(self, directory, seed, keyframe_interval=REPLAY_KEYFRAME_INTERVAL):
+        self.directory = directory
+        self.keyframes = SnapshotWriter(directory, keyframe_interval, keep=None)
+        self.log = open(os.path.join(directory, "events.jsonl"), "w")
+        self._write({"seed": seed, "keyframe_interval": keyframe_interval})
+
+    def _write(self, entry):
+        self.log.write(json.dumps(entry) + "\n")
+        self.log.flush()
+
+    def start(self, current_tick, cells, food_cells, obstacles, spatial_grid):
+        """Write the keyframe every replay starts from."""
+        self.keyframes.snapshot(current_tick, cells, food_cells, obstacles, spatial_grid)
+
+    def record(self, current_tick, event):
+        self._write({"tick": current_tick, **event})
+
+    def maybe_keyframe(self, current_tick, cells, food_cells, obstacles, spatial_grid):
+        self.keyframes.maybe_snapshot(current_tick, cells, food_cells, obstacles, spatial_grid)
+
+    def close(self):
+        self.keyframes.close()
+        self.log.close()
+
+
+class Replay:
+    """Reads a recording made by ReplayRecorder and reconstructs the world at any tick."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.events = {}
+        with open(os.path.join(directory, "events.jsonl")) as f:
+            header = json.loads(f.readline())
+            for line in f:
+                entry = json.loads(line)
+                self.events.setdefault(entry.pop("tick"), []).append(entry)
+        self.seed = header["seed"]
+        self.keyframes = [(SnapshotWriter.snapshot_tick(path), path)
+                          for path in SnapshotWriter.list_snapshots(directory)]
+        if not self.keyframes:
+            raise FileNotFoundError(f"No keyframes found in {directory}")
+
+    @property
+    def start_tick(self):
+        return self.keyframes[0][0]
+
+    def events_at(self, current_tick):
+        return self.events.get(current_tick, [])
+
+    def apply_events(self, current_tick, cells, food_cells, obstacles, spatial_grid):
+        for event in self.events_at(current_tick):
+            cells, food_cells, obstacles, spatial_grid = apply_input(event, cells, food_cells, obstacles, spatial_grid)
+        return cells, food_cells, obstacles, spatial_grid
+
+    def seek(self, target_tick):
+        """Return the world (cells, food_cells, obstacles, spatial_grid) as it was at target_tick.
+
+        Loads the nearest keyframe at or before target_tick and fast-forwards from there.
+        """
+        target_tick = max(target_tick, self.start_tick)
+        keyframe_tick, path = max((k for k in self.keyframes if k[0] <= target_tick), key=lambda k: k[0])
+        cells, food_cells, obstacles, spatial_grid = load_checkpoint(path)
+        while len(ticks) < target_tick:
+            cells, food_cells, obstacles, spatial_grid = self.apply_events(
+                len(ticks), cells, food_cells, obstacles, spatial_grid)
+            current_tick = record_history(cells, food_cells)
+            step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        print(f"Replay at tick {len(ticks)} (fast-forwarded {target_tick - keyframe_tick} ticks from keyframe)")
+        return cells, food_cells, obstacles, spatial_grid
+
+
+def initial_world(resume=None, replay=None, seek=0):
+    """Build the world a run starts from: a replay position, a checkpoint, or a fresh world."""
+    if replay:
+        return replay.seek(seek)
+    if resume:
+        return load_checkpoint(resume)
+    cells, food_cells, obstacles = new_world()
+    return cells, food_cells, obstacles, build_spatial_grid(cells)
+
+
+class Halo:
+    """Cells just outside a chunk, as seen by the chunk: positions to avoid.
+
+    Sits in the chunk's obstacle list, so movement and birth placement treat the
+    neighbours' border cells as occupied without being able to interact with them.
+    """
+
+    def __init__(self):
+        self.positions = set()
 
-    obstacles = generate_random_obstacles(NUM_OBSTACLES, MAX_OBSTACLE_WIDTH, MAX_OBSTACLE_HEIGHT)
+    def is_collision(self, x, y):
+        return (x, y) in self.positions
+
+    def blocks(self, xs, ys):
+        if not self.positions:
+            return np.zeros(np.shape(xs), dtype=bool)
+        halo_x, halo_y = np.array(list(self.positions)).T
+        return np.isin(slot_keys(xs, ys), slot_keys(halo_x, halo_y))
+
+
+class Chunk:
+    """One tile of a ChunkedWorld with its own cells, food, spatial grid and random streams.
+
+    Every chunk draws from its own random state and id range, so the outcome
+    doesn't depend on which process steps it or in what order.
+    """
+
+    def __init__(self, index, rect, cells, food_cells, obstacles, seed):
+        self.index = index
+        self.rect = rect
+        self.cells = cells
+        self.food_cells = food_cells
+        self.halo = Halo()
+        x0, y0, x1, y1 = rect
+        self.obstacles = ObstacleMap([o for o in obstacles
+                                      if o.x < x1 + CHUNK_HALO and o.x + o.width > x0 - CHUNK_HALO and
+                                      o.y < y1 + CHUNK_HALO and o.y + o.height > y0 - CHUNK_HALO] + [self.halo])
+        self.spatial_grid = build_spatial_grid(cells)
+        self.random_state = random.Random(seed).getstate()
+        self.numpy_state = np.random.default_rng(seed).bit_generator.state
+        self.next_id = (index + 1) * CHUNK_ID_SPACING
+
+    def contains(self, x, y):
+        x0, y0, x1, y1 = self.rect
+        return x0 <= x < x1 and y0 <= y < y1
+
+    def in_border(self, x, y):
+        x0, y0, x1, y1 = self.rect
+        return x < x0 + CHUNK_HALO or x >= x1 - CHUNK_HALO or y < y0 + CHUNK_HALO or y >= y1 - CHUNK_HALO
+
+    def step(self, current_tick, halo_positions, immigrants, new_food):
+        """Step the chunk. Returns (emigrant cells, border cell positions, cell count, food count)."""
+        global next_cell_id
+        # Swap in this chunk's random streams and id range (restored on the way out)
+        caller_state = (random.getstate(), rng.bit_generator.state, next_cell_id)
+        random.setstate(self.random_state)
+        rng.bit_generator.state = self.numpy_state
+        next_cell_id = self.next_id
+
+        self.cells.extend(immigrants)
+        self.spatial_grid.add_many(immigrants)
+        self.food_cells.extend(new_food)
+        self.halo.positions = set(halo_positions)
+
+        step_simulation(self.cells, self.food_cells, self.spatial_grid, self.obstacles, current_tick, respawn=False)
+        # The lineage store only sees part of the world here, keep it from growing
+        lineage.clear()
+
+        # Hand cells that walked out of the chunk over to the coordinator. A mating
+        # pair stays until it is done: a partner pickled along to another chunk
+        # (or process) would be a copy, and the pair would come apart
+        staying = []
+        emigrants = []
+        for cell in self.cells:
+            (staying if cell.partner is not None or self.contains(cell.x, cell.y) else emigrants).append(cell)
+        for cell in emigrants:
+            self.spatial_grid.remove(cell)
+            # Targets refer to objects in this chunk; drop them instead of pickling them along
+            cell.goal = GOAL_NONE
+            cell.target = None
+        if emigrants:
+            # Nor may anyone here keep chasing a cell that left
+            gone = set(map(id, emigrants))
+            for cell in staying:
+                if cell.goal == GOAL_MATE and id(cell.target) in gone:
+                    cell.goal = GOAL_NONE
+                    cell.target = None
+        self.cells = staying
+        border = [(cell.x, cell.y) for cell in staying if self.in_border(cell.x, cell.y)]
+
+        self.random_state = random.getstate()
+        self.numpy_state = rng.bit_generator.state
+        self.next_id = next_cell_id
+        random_state, numpy_state, next_cell_id = caller_state
+        random.setstate(random_state)
+        rng.bit_generator.state = numpy_state
+        return emigrants, border, len(self.cells), len(self.food_cells)
+
+
+def _chunk_worker(connection, chunks, settings, config):
+    """Worker process: owns some chunks and steps them when asked.
+
+    settings ({name: value} for WORKER_SETTINGS) and config are the
+    coordinator's, applied before anything is stepped.
+    """
+    globals().update(settings)
+    apply_config(config)
+    chunks = {chunk.index: chunk for chunk in chunks}
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        command, current_tick, inputs = message
+        if command == "step":
+            connection.send({index: chunks[index].step(current_tick, *args) for index, args in inputs.items()})
+        elif command == "gather":
+            connection.send({index: (chunk.cells, chunk.food_cells) for index, chunk in chunks.items()})
+    connection.close()
+
+
+class ChunkedWorld:
+    """The world split into chunks_x * chunks_y tiles that can be stepped in parallel.
+
+    Each tick the coordinator sends every chunk the border cells of its
+    neighbours (the halo), the cells that moved into it and its share of the
+    newly spawned food. Chunks step independently, in worker processes when
+    workers > 0, and hand back the cells that left them. Hand-offs are applied
+    in chunk order, so a run is reproducible for any number of workers.
+    Cells only interact with cells in their own chunk, and mating pairs are only
+    handed off once they are done. start_method picks the
+    multiprocessing start method ("fork", "spawn", ...), the platform default when None.
+    """
+
+    def __init__(self, cells, food_cells, obstacles, chunks_x, chunks_y, workers=0, seed=0, start_method=None):
+        self.chunks_x = chunks_x
+        self.chunks_y = chunks_y
+        self.chunk_width = WORLD_WIDTH / chunks_x
+        self.chunk_height = WORLD_HEIGHT / chunks_y
+        self.obstacles = obstacles
+        count = chunks_x * chunks_y
+
+        chunk_cells = [[] for _ in range(count)]
+        chunk_food = [[] for _ in range(count)]
+        for cell in cells:
+            chunk_cells[self.chunk_index(cell.x, cell.y)].append(cell)
+        for food in food_cells:
+            chunk_food[self.chunk_index(food.x, food.y)].append(food)
+        seeds = np.random.SeedSequence(seed).generate_state(count).tolist()
+        chunks = []
+        for index in range(count):
+            cx, cy = index % chunks_x, index // chunks_x
+            rect = (cx * self.chunk_width, cy * self.chunk_height,
+                    (cx + 1) * self.chunk_width, (cy + 1) * self.chunk_height)
+            chunks.append(Chunk(index, rect, chunk_cells[index], chunk_food[index], obstacles, seeds[index]))
+
+        self.neighbours = [self._neighbours(index) for index in range(count)]
+        self.borders = [[] for _ in range(count)]
+        self.immigrants = [[] for _ in range(count)]
+        self.cell_count = len(cells)
+        self.food_count = len(food_cells)
+
+        self.local_chunks = None
+        self.connections = []
+        self.processes = []
+        if workers <= 0:
+            self.local_chunks = chunks
+        else:
+            import multiprocessing
+            context = multiprocessing.get_context(start_method)
+            settings = {name: globals()[name] for name in WORKER_SETTINGS}
+            config = SimulationConfig.current()
+            for worker in range(min(workers, count)):
+                parent_end, child_end = context.Pipe()
+                process = context.Process(target=_chunk_worker,
+                                          args=(child_end, chunks[worker::workers], settings, config), daemon=True)
+                process.start()
+                child_end.close()
+                self.connections.append(parent_end)
+                self.processes.append(process)
+
+    def chunk_index(self, x, y):
+        cx = min(max(int(x // self.chunk_width), 0), self.chunks_x - 1)
+        cy = min(max(int(y // self.chunk_height), 0), self.chunks_y - 1)
+        return cy * self.chunks_x + cx
+
+    def _neighbours(self, index):
+        cx, cy = index % self.chunks_x, index // self.chunks_x
+        return [ny * self.chunks_x + nx
+                for nx in range(cx - 1, cx + 2) for ny in range(cy - 1, cy + 2)
+                if (nx, ny) != (cx, cy) and 0 <= nx < self.chunks_x and 0 <= ny < self.chunks_y]
+
+    def _send(self, command, current_tick, inputs):
+        """Run a command on every chunk and return {chunk index: result}."""
+        if self.local_chunks is not None:
+            if command == "step":
+                return {i: self.local_chunks[i].step(current_tick, *inputs[i]) for i in inputs}
+            return {chunk.index: (chunk.cells, chunk.food_cells) for chunk in self.local_chunks}
+        workers = len(self.connections)
+        for worker, connection in enumerate(self.connections):
+            connection.send((command, current_tick,
+                             {i: args for i, args in inputs.items() if i % workers == worker}))
+        results = {}
+        for connection in self.connections:
+            results.update(connection.recv())
+        return results
+
+    def step(self, current_tick):
+        # Food spawning is world-wide, exactly like respawn_food in a single world
+        new_food = []
+        respawn_food(new_food, self.obstacles, current_tick, total_food=self.food_count)
+        food_by_chunk = [[] for _ in self.neighbours]
+        for food in new_food:
+            food_by_chunk[self.chunk_index(food.x, food.y)].append(food)
+
+        inputs = {}
+        for index, neighbours in enumerate(self.neighbours):
+            halo = [position for neighbour in neighbours for position in self.borders[neighbour]]
+            inputs[index] = (halo, self.immigrants[index], food_by_chunk[index])
+        results = self._send("step", current_tick, inputs)
+
+        self.immigrants = [[] for _ in self.neighbours]
+        self.cell_count = 0
+        self.food_count = 0
+        for index in sorted(results):
+            emigrants, border, cell_count, food_count = results[index]
+            self.borders[index] = border
+            for cell in emigrants:
+                self.immigrants[self.chunk_index(cell.x, cell.y)].append(cell)
+            self.cell_count += cell_count + len(emigrants)
+            self.food_count += food_count
+
+    def gather(self):
+        """Collect every cell and food item into two plain lists."""
+        results = self._send("gather", 0, {})
+        cells = [cell for index in sorted(results) for cell in results[index][0]]
+        cells.extend(cell for immigrants in self.immigrants for cell in immigrants)
+        food_cells = [food for index in sorted(results) for food in results[index][1]]
+        return cells, food_cells
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+
+
+class RollingStats:
+    """Mean and variance of the last `window` values, updated in O(1) per value."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_squares = 0.0
+
+    def push(self, value):
+        """Add value; returns the value that dropped out of the window, or None."""
+        self.values.append(value)
+        self.total += value
+        self.total_squares += value * value
+        if len(self.values) <= self.window:
+            return None
+        old = self.values.popleft()
+        self.total -= old
+        self.total_squares -= old * old
+        return old
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    @property
+    def mean(self):
+        return self.total / len(self.values)
+
+    @property
+    def std(self):
+        mean = self.mean
+        return math.sqrt(max(self.total_squares / len(self.values) - mean * mean, 0.0))
+
+
+class TerminationCriteria:
+    """Decides when a headless run has nothing left to show.
+
+    check() gets the cell and food counts after every tick and returns the
+    reason to stop, or None. Criteria:
+      - extinction: no cells left
+      - max_cells: the population reached this ceiling
+      - steady_window: mean and standard deviation of both counts over the last
+        steady_window ticks are within steady_tolerance (relative to the mean)
+        of those over the window before. Catches stable levels and oscillations
+        shorter than the window.
+    """
+
+    def __init__(self, extinction=True, max_cells=None, steady_window=None,
+                 steady_tolerance=STEADY_STATE_TOLERANCE):
+        self.extinction = extinction
+        self.max_cells = max_cells
+        self.steady_tolerance = steady_tolerance
+        self.series = []  # (current window, previous window) for the cell and the food count
+        if steady_window:
+            self.series = [(RollingStats(steady_window), RollingStats(steady_window)) for _ in range(2)]
+
+    def check(self, cell_count, food_count):
+        if self.extinction and cell_count == 0:
+            return "extinction"
+        if self.max_cells and cell_count >= self.max_cells:
+            return f"population reached {self.max_cells} cells"
+        steady = bool(self.series)
+        for (current, previous), value in zip(self.series, (cell_count, food_count)):
+            old = current.push(value)
+            if old is not None:
+                previous.push(old)
+            steady = steady and previous.full and self._unchanged(current, previous)
+        if steady:
+            return f"steady state over {2 * self.series[0][0].window} ticks"
+        return None
+
+    def _unchanged(self, current, previous):
+        limit = self.steady_tolerance * max(previous.mean, 1.0)
+        return abs(current.mean - previous.mean) <= limit and abs(current.std - previous.std) <= limit
+
+
+def run_chunked(num_ticks, chunks_x, chunks_y, workers=0, seed=0, report_every=500, termination=None):
+    """Headless run of a fresh world split into chunks (see ChunkedWorld)."""
+    cells, food_cells, obstacles = new_world()
+    world = ChunkedWorld(cells, food_cells, obstacles, chunks_x, chunks_y, workers, seed)
+    try:
+        for _ in range(num_ticks):
+            ticks.append(len(ticks) + 1)
+            current_tick = len(ticks)
+            world.step(current_tick)
+            live_cells_history.append(world.cell_count)
+            food_cells_history.append(world.food_count)
+            if report_every and current_tick % report_every == 0:
+                print(f"Tick {current_tick}: {world.cell_count} cells, {world.food_count} food")
+            reason = termination.check(world.cell_count, world.food_count) if termination else None
+            if reason:
+                print(f"Stopping at tick {current_tick}: {reason}")
+                break
+        return world.gather()
+    finally:
+        world.close()
+
+
+def update_status_batch(cells):
+    """The per-tick status update (ageing, mortality, hunger, hp, cooldown, stamina)
+    for any number of cells, from any number of worlds, as array operations.
+
+    step_simulation runs it for every cell at the end of every tick; it is the
+    only copy of these rules. Returns a boolean array that is True for the cells
+    that died.
+    """
+    n = len(cells)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    def column(field, dtype=np.float64):
+        return np.fromiter(map(attrgetter(field), cells), dtype=dtype, count=n)
+
+    x, y = column("x"), column("y")
+    outside = (x < 0) | (x >= WORLD_WIDTH) | (y < 0) | (y >= WORLD_HEIGHT)
+    for i in np.flatnonzero(outside).tolist():
+        cell = cells[i]
+        print(f"WARNING: Cell at ({cell.x}, {cell.y}) is outside bounds! Clamping...")
+        cell.x = (max(0, min(cell.x, WORLD_WIDTH - CELL_SIZE)) // CELL_SIZE) * CELL_SIZE
+        cell.y = (max(0, min(cell.y, WORLD_HEIGHT - CELL_SIZE)) // CELL_SIZE) * CELL_SIZE
+
+    age = column("age", np.int64) + 1
+    mortality = column("mortality_chance")
+    mortality[age > 0.7 * MAX_AGE] += 0.00001
+    hp = column("hp")
+    died = rng.random(n) < mortality
+    hp[died] = 0
+    if died.any():
+        print(f"{np.count_nonzero(died)} cells have died")
+    hunger = column("hunger") - 0.8 * column("metabolic_rate")
+    hp[hunger <= 0] -= 0.5
+    hp[hunger >= 100] += 0.1
+    np.minimum(hp, MAX_HP, out=hp)
+    cooldown = column("mating_cooldown", np.int64)
+    cooldown[cooldown > 0] -= 1
+    stamina = np.minimum(column("stamina") + IDLE_STAMINA_GAIN, MAX_STAMINA)
+    dead = hp <= 0
+
+    for cell, cell_age, cell_mortality, cell_hp, cell_hunger, cell_cooldown, cell_stamina, cell_dead in zip(
+            cells, age.tolist(), mortality.tolist(), hp.tolist(), hunger.tolist(), cooldown.tolist(),
+            stamina.tolist(), dead.tolist()):
+        cell.age = cell_age
+        cell.mortality_chance = cell_mortality
+        cell.hp = cell_hp
+        cell.hunger = cell_hunger
+        cell.mating_cooldown = cell_cooldown
+        cell.stamina = cell_stamina
+        if cell_dead:
+            cell.is_dead = True
+    return dead
+
+
+def remove_dead_cells(cells, dead, spatial_grid, current_tick):
+    """Take the cells that update_status_batch marked dead out of cells and the grid."""
+    if not dead.any():
+        return
+    for cell, cell_dead in zip(cells, dead.tolist()):
+        if cell_dead:
+            spatial_grid.remove(cell)
+            lineage.record_death(cell.id, current_tick)
+    cells[:] = [cell for cell, cell_dead in zip(cells, dead.tolist()) if not cell_dead]
+
+
+class EnsembleEngine:
+    """num_worlds replicate worlds with the same parameters, stepped together in one process.
+
+    Every world starts from its own seed. Movement, sensing and mating run per
+    world (step_simulation with batched=True). The status update, food respawn
+    and food despawn then run once per tick over the cells and food of all
+    worlds, in the same order as at the end of step_simulation, with the world
+    as the leading index of the batched arrays. The worlds share the random
+    generators while they run, so a replicate is reproducible for a given seed
+    and number of worlds, not on its own; with a single world it is the same
+    run as step_simulation from the same seed. Lineages are not tracked.
+    """
+
+    def __init__(self, num_worlds, seed=0):
+        self.worlds = []  # (cells, food_cells, obstacles, spatial_grid) per world
+        spawners = []
+        for world_seed in np.random.SeedSequence(seed).generate_state(num_worlds).tolist():
+            seed_simulation(world_seed)
+            cells, food_cells, obstacles = new_world()
+            self.worlds.append((cells, food_cells, obstacles, build_spatial_grid(cells)))
+            spawners.append(FoodSpawner(obstacles, patches=food_patches))
+        seed_simulation(seed)
+        lineage.clear()
+        self.spawners = spawners
+
+        # Food slots of all worlds back to back. World k's cdf is shifted up by k,
+        # so a single searchsorted over k + u finds the slots of every world.
+        usable = [spawner.cdf is not None for spawner in spawners]
+        self.can_spawn = np.array(usable)
+        self.slot_x = np.concatenate([spawner.xs if ok else spawner.xs[:0] for spawner, ok in zip(spawners, usable)])
+        self.slot_y = np.concatenate([spawner.ys if ok else spawner.ys[:0] for spawner, ok in zip(spawners, usable)])
+        self.cdf = np.concatenate([spawner.cdf + k if ok else np.zeros(0)
+                                   for k, (spawner, ok) in enumerate(zip(spawners, usable))])
+        self.slot_end = np.cumsum([len(spawner.xs) if ok else 0 for spawner, ok in zip(spawners, usable)])
+        self.metrics = []  # One row of ENSEMBLE_METRICS per world and tick
+
+    def step(self, current_tick):
+        """Advance every world by one tick; returns this tick's metrics, one tuple per world."""
+        for cells, food_cells, obstacles, spatial_grid in self.worlds:
+            step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick, batched=True)
+
+        # Status after movement, mating and births, as at the end of step_simulation,
+        # but for the cells of all worlds in one go
+        dead = update_status_batch([cell for cells, _, _, _ in self.worlds for cell in cells])
+        start = 0
+        for cells, _, _, spatial_grid in self.worlds:
+            end = start + len(cells)
+            remove_dead_cells(cells, dead[start:end], spatial_grid, current_tick)
+            start = end
+        lineage.clear()
+        self.respawn_food(current_tick)
+        self.despawn_food(current_tick)
+
+        row = [(len(cells), len(food_cells), max((cell.generation for cell in cells), default=0))
+               for cells, food_cells, _, _ in self.worlds]
+        self.metrics.append(row)
+        return row
+
+    def respawn_food(self, current_tick):
+        """FoodSpawner.spawn for every world, with one Poisson draw and one slot lookup for the batch."""
+        totals = [len(food_cells) for _, food_cells, _, _ in self.worlds]
+        expected = np.array([spawner.expected_spawns(total) for spawner, total in zip(self.spawners, totals)])
+        expected[~self.can_spawn] = 0.0
+        counts = np.clip(np.minimum(rng.poisson(expected), MAX_FOOD_CELLS - np.array(totals)), 0, None)
+        count = int(counts.sum())
+        if count == 0:
+            return
+        world = np.repeat(np.arange(len(counts)), counts)
+        slots = np.searchsorted(self.cdf, world + rng.random(count), side="right")
+        slots = np.minimum(slots, self.slot_end[world] - 1)  # Rounding at the top of a world's cdf
+        xs = self.slot_x[slots].tolist()
+        ys = self.slot_y[slots].tolist()
+        start = 0
+        for (_, food_cells, _, _), world_count in zip(self.worlds, counts.tolist()):
+            end = start + world_count
+            food_cells.extend(Food(x, y, current_tick) for x, y in zip(xs[start:end], ys[start:end]))
+            start = end
+
+    def despawn_food(self, current_tick):
+        """Food.should_despawn for the food of all worlds at once."""
+        global food_despawned_count
+        all_food = [food for _, food_cells, _, _ in self.worlds for food in food_cells]
+        spawn_ticks = np.fromiter(map(attrgetter("spawn_tick"), all_food), dtype=np.int64, count=len(all_food))
+        old = current_tick - spawn_ticks > FOOD_DESPAWN_TIME
+        if not old.any():
+            return
+        start = 0
+        for _, food_cells, _, _ in self.worlds:
+            world_old = old[start:start + len(food_cells)].tolist()
+            start += len(food_cells)
+            for food, food_old in zip(food_cells, world_old):
+                if food_old:
+                    food.consume()
+            food_cells[:] = [food for food, food_old in zip(food_cells, world_old) if not food_old]
+        count = int(np.count_nonzero(old))
+        food_despawned_count += count
+        print(f"Despawned {count} old food cells")
+
+    def metrics_array(self):
+        """The metrics so far as an array of shape (ticks, worlds, len(ENSEMBLE_METRICS))."""
+        return np.array(self.metrics, dtype=np.int64).reshape(len(self.metrics), len(self.worlds),
+                                                              len(ENSEMBLE_METRICS))
+
+
+def run_ensemble(num_ticks, num_worlds, seed=0, path=ENSEMBLE_PATH, report_every=500):
+    """Headless run of num_worlds replicate worlds; saves their metrics to path (see EnsembleEngine)."""
+    engine = EnsembleEngine(num_worlds, seed)
+    for _ in range(num_ticks):
+        ticks.append(len(ticks) + 1)
+        current_tick = len(ticks)
+        row = engine.step(current_tick)
+        if report_every and current_tick % report_every == 0:
+            populations = [cell_count for cell_count, _, _ in row]
+            print(f"Tick {current_tick}: {np.count_nonzero(populations)} of {num_worlds} worlds alive, "
+                  f"{np.mean(populations):.1f} cells on average")
+    metrics = engine.metrics_array()
+    np.savez(path, metrics=metrics, names=np.array(ENSEMBLE_METRICS), seed=np.array(seed))
+    print(f"Saved metrics of {num_worlds} worlds over {len(metrics)} ticks to {path}")
+    return metrics
+
+
+def run_headless(num_ticks, resume=None, save=None, report_every=500, snapshot_writer=None,
+                 recorder=None, replay=None, seek=0, exporter=None, config_watcher=None, scheduler=None,
+                 termination=None, control=None):
+    """Run the simulation without a window, for num_ticks or until termination says to stop.
+
+    Ticks spent paused by the control server don't count towards num_ticks.
+    """
+    cells, food_cells, obstacles, spatial_grid = initial_world(resume, replay, seek)
+    if recorder:
+        recorder.start(len(ticks), cells, food_cells, obstacles, spatial_grid)
+
+    scheduler_event = None
+    ticks_run = 0
+    while ticks_run < num_ticks:
+        events = [config_watcher.poll(len(ticks)) if config_watcher else None, scheduler_event]
+        scheduler_event = None
+        for command in control.poll() if control else ():
+            if command.get("action") == "snapshot":
+                save_checkpoint(command["path"], cells, food_cells, obstacles, spatial_grid)
+            elif "kind" in command:
+                events.append(command)
+        for event in filter(None, events):
+            if recorder:
+                recorder.record(len(ticks), event)
+            cells, food_cells, obstacles, spatial_grid = apply_input(event, cells, food_cells, obstacles, spatial_grid)
+        if control and control.paused:
+            time.sleep(CONTROL_IDLE_SLEEP)
+            continue
+        ticks_run += 1
+        if replay:
+            cells, food_cells, obstacles, spatial_grid = replay.apply_events(
+                len(ticks), cells, food_cells, obstacles, spatial_grid)
+        current_tick = record_history(cells, food_cells)
+        start = time.perf_counter()
+        step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        if scheduler:
+            scheduler_event = scheduler.observe((time.perf_counter() - start) * 1000)
+        if snapshot_writer:
+            snapshot_writer.maybe_snapshot(current_tick, cells, food_cells, obstacles, spatial_grid)
+        if recorder:
+            recorder.maybe_keyframe(current_tick, cells, food_cells, obstacles, spatial_grid)
+        if exporter:
+            exporter.maybe_export(current_tick, cells)
+        if control:
+            control.publish(current_tick, cells, food_cells)
+        if report_every and current_tick % report_every == 0:
+            print(f"Tick {current_tick}: {len(cells)} cells, {len(food_cells)} food, "
+                  f"{len(lineage.living_lineages())} living lineages")
+        reason = termination.check(len(cells), len(food_cells)) if termination else None
+        if reason:
+            print(f"Stopping at tick {current_tick}: {reason}")
+            break
+
+    if save:
+        save_checkpoint(save, cells, food_cells, obstacles, spatial_grid)
+    return cells, food_cells, obstacles
+
+
+def main(resume=None, snapshot_writer=None, recorder=None, replay=None, seek=0, exporter=None, config_watcher=None,
+         scheduler=None, control=None):
+    import pygame  # Only the window needs pygame; headless runs and tools never import it
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH + 300, SCREEN_HEIGHT)) # extend for sidebar
+    pygame.display.set_caption("Pixel Life")
 
+    graph_surface_cells = pygame.Surface((300, 75))
+    graph_surface_cells.fill(BLACK)
+    graph_surface_food = pygame.Surface((300, 75))
+    graph_surface_food.fill(BLACK)
+
+    cells, food_cells, obstacles, spatial_grid = initial_world(resume, replay, seek)
+    if recorder:
+        recorder.start(len(ticks), cells, food_cells, obstacles, spatial_grid)
 
     clock = pygame.time.Clock()
     running = True
-    paused = False
+    paused = replay is not None  # The replay viewer starts paused at the seek position
     draw_mode = False
     debug_view = False  # Global debug view flag
+    camera = Camera()
+    camera.reset()
+    panning = False  # Dragging the view with the middle mouse button
+    scheduler_event = None
 
     font = pygame.font.Font(None, 16)  # Initialize font
+    debug_overlay = DebugOverlay(font)
     sidebar_font = pygame.font.Font(None, 36)  # Initialize font
 
     while running:
         screen.fill(BLACK)
-        # Declare globals at the beginning of the function if they are modified
-        global FOOD_RESPAWN_RATE
-        global MIN_FOOD_CELLS
-        global food_despawned_count
+        inputs = []  # External inputs for this frame, see apply_input
 
-        live_cells_count = len(cells)
-        food_cells_count = len(food_cells)
         highest_generation = max((cell.generation for cell in cells), default=0)
-        live_cells_history.append(live_cells_count)
-        food_cells_history.append(food_cells_count)
-
-        # Ensure synchronized updates for ticks and histories
-        ticks.append(len(ticks) + 1)
-        highest_generation_history.append(highest_generation)
 
         # Draw obstacles first
-        #draw_obstacles(screen, obstacles)
+        draw_obstacles(screen, obstacles, camera)
 
 
         # Draw the sidebar with statistics
@@ -730,17 +3658,7 @@ def main():
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
-                    obstacles = generate_random_obstacles(NUM_OBSTACLES, MAX_OBSTACLE_WIDTH, MAX_OBSTACLE_HEIGHT)
-                    cells, food_cells = reset_simulation(NUM_INITIAL_CELLS, NUM_INITIAL_FOOD, obstacles)
-                    spatial_grid = SpatialGrid(SCREEN_WIDTH, SCREEN_HEIGHT, GRID_CELL_SIZE)
-                    for cell in cells:
-                        spatial_grid.add(cell)
-                    # Reset counters
-                    global mating_attempts, mating_successes, food_despawned_count
-                    mating_attempts = 0
-                    mating_successes = 0
-                    food_despawned_count = 0
-                    print("Reset grid and obstacles.")
+                    inputs.append({"kind": "reset"})
                 elif event.key == pygame.K_p:
                     paused = not paused
                     print("Pause Toggled.")
@@ -748,132 +3666,217 @@ def main():
                     draw_mode = not draw_mode
                     print("Toggled draw mode.")
                 elif event.key == pygame.K_UP:
-                    MIN_FOOD_CELLS += 1
-                    print(f"Increased Minimum food cells to: {MIN_FOOD_CELLS}")
+                    inputs.append({"kind": "set_min_food_cells", "value": MIN_FOOD_CELLS + 1})
                 elif event.key == pygame.K_DOWN:
-                    MIN_FOOD_CELLS = max(0, MIN_FOOD_CELLS - 1)
-                    print(f"Decreased Minimum food cells to: {MIN_FOOD_CELLS}")
+                    inputs.append({"kind": "set_min_food_cells", "value": max(0, MIN_FOOD_CELLS - 1)})
                 elif event.key == pygame.K_RIGHT:
-                    FOOD_RESPAWN_RATE = min(FOOD_RESPAWN_RATE + 0.1, 10.0)
-                    print(f"Increased food respawn rate: {FOOD_RESPAWN_RATE}")
+                    inputs.append({"kind": "set_food_respawn_rate", "value": min(FOOD_RESPAWN_RATE + 0.1, FOOD_RESPAWN_RATE_MAX)})
                 elif event.key == pygame.K_LEFT:
-                    FOOD_RESPAWN_RATE = max(FOOD_RESPAWN_RATE - 0.1, 0.0)
-                    print(f"Decreased food respawn rate: {FOOD_RESPAWN_RATE}")
+                    inputs.append({"kind": "set_food_respawn_rate", "value": max(FOOD_RESPAWN_RATE - 0.1, 0.0)})
+                elif event.key == pygame.K_HOME:
+                    camera.reset()
                 elif event.key == pygame.K_F1:
                     debug_view = not debug_view
                     print(f"Debug view {'enabled' if debug_view else 'disabled'}.")
-
-
-            elif event.type == pygame.MOUSEBUTTONDOWN and draw_mode:
-                x, y = pygame.mouse.get_pos()
-                x = (x // CELL_SIZE) * CELL_SIZE
-                y = (y // CELL_SIZE) * CELL_SIZE
+                elif event.key == pygame.K_F5:
+                    save_checkpoint(CHECKPOINT_PATH, cells, food_cells, obstacles, spatial_grid)
+                elif event.key == pygame.K_F9:
+                    if recorder:
+                        # The recording could not be replayed past a jump to an unrelated state
+                        print("Can't load a checkpoint while recording a replay.")
+                        continue
+                    try:
+                        cells, food_cells, obstacles, spatial_grid = load_checkpoint(CHECKPOINT_PATH)
+                    except (OSError, ValueError) as e:
+                        print(f"Could not load checkpoint: {e}")
+                elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET) and replay:
+                    step = REPLAY_SEEK_STEP if event.key == pygame.K_RIGHTBRACKET else -REPLAY_SEEK_STEP
+                    cells, food_cells, obstacles, spatial_grid = replay.seek(len(ticks) + step)
+
+            elif event.type == pygame.MOUSEWHEEL:
+                mouse_x, mouse_y = pygame.mouse.get_pos()
+                if mouse_x < SCREEN_WIDTH:
+                    camera.zoom_at(1.25 ** event.y, mouse_x, mouse_y)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 2:
+                panning = True
+            elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+                panning = False
+            elif event.type == pygame.MOUSEMOTION and panning:
+                camera.pan(*event.rel)
+            elif event.type == pygame.MOUSEBUTTONDOWN and draw_mode and event.button in (1, 3):
+                mouse_x, mouse_y = event.pos
+                if mouse_x >= SCREEN_WIDTH:
+                    continue  # Clicked on the sidebar
+                x, y = camera.screen_to_world(mouse_x, mouse_y)
+                if not (0 <= x < WORLD_WIDTH and 0 <= y < WORLD_HEIGHT):
+                    continue
+                x = int(x // CELL_SIZE) * CELL_SIZE
+                y = int(y // CELL_SIZE) * CELL_SIZE
                 if event.button == 1:  # Left click
-                    cell = Cell(x, y)
-                    cells.append(cell)
-                    spatial_grid.add(cell)
-                    print("Spawned Cell")
-                elif event.button == 3:  # Right click
-                    food_cells.append(Food(x, y))
-                    print("Spawned Food.")
+                    inputs.append({"kind": "spawn_cell", "x": x, "y": y})
+                else:  # Right click
+                    inputs.append({"kind": "spawn_food", "x": x, "y": y})
+
+        if config_watcher and not paused:
+            event = config_watcher.poll(len(ticks))
+            if event:
+                inputs.append(event)
+        if scheduler_event:
+            inputs.append(scheduler_event)
+            scheduler_event = None
+        if control:
+            was_paused = control.paused
+            for command in control.poll():
+                if command.get("action") == "snapshot":
+                    save_checkpoint(command["path"], cells, food_cells, obstacles, spatial_grid)
+                elif "kind" in command:
+                    inputs.append(command)
+            if control.paused != was_paused:
+                paused = control.paused
+
+        for event in inputs:
+            if recorder:
+                recorder.record(len(ticks), event)
+            cells, food_cells, obstacles, spatial_grid = apply_input(event, cells, food_cells, obstacles, spatial_grid)
 
         if not paused:
-            new_cells = []
-            for cell in cells:
-                cell.move(food_cells, spatial_grid, obstacles)
-                cell.update_status()
-                
-                # Improved food eating logic - check for food at cell position
-                food_to_remove = None
-                for food in food_cells:
-                    # Check if cell is at the same grid position as food
-                    if (abs(cell.x - food.x) < CELL_SIZE and 
-                        abs(cell.y - food.y) < CELL_SIZE and 
-                        food.x != -1 and food.y != -1):
-                        food_to_remove = food
-                        break
-                
-                if food_to_remove:
-                    cell.eat(food_to_remove, food_cells)
-                
-                for other in spatial_grid.get_nearby(cell.x, cell.y):
-                    if cell != other and cell.is_adjacent(other):
-                        # Only allow mating if both cells meet the relaxed conditions
-                        if (not cell.is_mating and not other.is_mating and 
-                            cell.mating_cooldown == 0 and other.mating_cooldown == 0 and
-                            cell.hunger >= 70 and other.hunger >= 70 and
-                            cell.hp >= 70 and other.hp >= 70 and
-                            cell.stamina >= 50 and other.stamina >= 50):
-                            cell.start_mating(other)
-                    if cell.is_mating and other.is_mating and cell.is_adjacent(other):
-                        offspring = cell.mate(other, spatial_grid, obstacles)  # Pass obstacles here
-                        new_cells.extend(offspring)
-                if cell.hp <= 0:
-                    spatial_grid.remove(cell)
-                    cells.remove(cell)
-                if cell.hp > 0:
-                    if cell.is_mating:
-                        color = HOT_PINK
-                    elif cell.stamina == 0 and cell.hunger >= 10:
-                        color = RED
-                    elif cell.hunger > 90:
-                        color = CYAN
-                    elif cell.mating_cooldown >= 1:
-                        color = PINK
-                    elif cell.stamina <= 20:
-                        color = YELLOW
-                    elif cell.hunger >= 90 and cell.stamina >= 75:
-                        color = BLUE
-                    elif cell.stamina <= 15 and cell.hunger <= 30:
-                        color = ORANGE
-                    elif cell.age >= 400:
-                        color = GRAY
-                    else:
-                        color = WHITE
-                    # Draw the cell
-                    pygame.draw.rect(screen, color, (cell.x, cell.y, CELL_SIZE, CELL_SIZE))
-
-                    # Draw debug view for the current cell
-                    if debug_view:
-                        center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-                        draw_debug_view(screen, cell, center_x, center_y, font)
-                        #print(f"Debug view drawn for cell at ({cell.x}, {cell.y})") # Spams console
-
-            cells.extend(new_cells)
-            respawn_food(food_cells, obstacles, len(ticks)) # Pass current tick
-            
-            # Despawn old food
-            current_tick = len(ticks)
-            food_to_despawn = []
-            for food in food_cells:
-                if food.should_despawn(current_tick):
-                    food_to_despawn.append(food)
-            for food in food_to_despawn:
-                food_cells.remove(food)
-                food_despawned_count += 1
-            if len(food_to_despawn) > 0:
-                print(f"Despawned {len(food_to_despawn)} old food cells")
-
-            for food in food_cells:
-                if food.x != -1 and food.y != -1:
-                    # Calculate food age for visual feedback
-                    food_age = current_tick - food.spawn_tick
-                    age_ratio = min(food_age / FOOD_DESPAWN_TIME, 1.0)
-                    
-                    # Food gets more faded as it gets older
-                    if age_ratio > 0.8:  # Very old food - red tint
-                        food_color = (int(255 * (1 - age_ratio)), 255, int(255 * (1 - age_ratio)))
-                    elif age_ratio > 0.6:  # Old food - yellow tint
-                        food_color = (255, 255, int(255 * (1 - age_ratio * 0.5)))
-                    else:  # Fresh food - normal green
-                        food_color = GREEN
-                    
-                    pygame.draw.rect(screen, food_color, (food.x, food.y, CELL_SIZE, CELL_SIZE))
-
-            pygame.display.flip()
-            clock.tick(TICK_RATE)
+            if replay:
+                cells, food_cells, obstacles, spatial_grid = replay.apply_events(
+                    len(ticks), cells, food_cells, obstacles, spatial_grid)
+            current_tick = record_history(cells, food_cells)
+            start = time.perf_counter()
+            step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+            if scheduler:
+                scheduler_event = scheduler.observe((time.perf_counter() - start) * 1000)
+            if snapshot_writer:
+                snapshot_writer.maybe_snapshot(current_tick, cells, food_cells, obstacles, spatial_grid)
+            if recorder:
+                recorder.maybe_keyframe(current_tick, cells, food_cells, obstacles, spatial_grid)
+            if exporter:
+                exporter.maybe_export(current_tick, cells)
+            if control:
+                control.publish(current_tick, cells, food_cells)
+
+        draw_world(screen, cells, food_cells, len(ticks), debug_overlay if debug_view else None, camera, spatial_grid)
+        pygame.display.flip()
+        clock.tick(TICK_RATE)
 
     pygame.quit()
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pixel Life cell simulation")
+    parser.add_argument("--headless", action="store_true", help="Run without a window")
+    parser.add_argument("--ticks", type=int, default=10000, help="Number of ticks to run in headless mode")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument("--resume", metavar="PATH",
+                        help="Resume from a checkpoint file, or the newest snapshot in a directory")
+    parser.add_argument("--save", metavar="PATH", help="Save a checkpoint when the headless run ends")
+    parser.add_argument("--autosave-every", type=int, default=0, metavar="N",
+                        help="Write a snapshot every N ticks in the background (0 disables)")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR,
+                        help="Directory for autosave snapshots and control server snapshots")
+    parser.add_argument("--keep-snapshots", type=int, default=SNAPSHOTS_TO_KEEP,
+                        help="Number of autosave snapshots to keep")
+    parser.add_argument("--record", metavar="DIR", help="Record a replay (inputs and keyframes) into DIR")
+    parser.add_argument("--keyframe-every", type=int, default=REPLAY_KEYFRAME_INTERVAL, metavar="N",
+                        help="Ticks between replay keyframes")
+    parser.add_argument("--replay", metavar="DIR", help="Replay a recording made with --record")
+    parser.add_argument("--seek", type=int, default=0, metavar="TICK", help="Tick to start the replay at")
+    parser.add_argument("--export-trajectories", metavar="DIR",
+                        help="Export per-cell columns to chunked files in DIR")
+    parser.add_argument("--export-every", type=int, default=TRAJECTORY_INTERVAL, metavar="N",
+                        help="Ticks between trajectory samples")
+    parser.add_argument("--export-format", choices=("npz", "parquet"), default="npz",
+                        help="Trajectory chunk format (parquet needs pyarrow)")
+    parser.add_argument("--tick-budget", type=float, metavar="MS",
+                        help="Spread target searches over more ticks when a tick takes longer than MS")
+    parser.add_argument("--config", metavar="PATH",
+                        help="Load parameters from a JSON/TOML file and reload it when it changes")
+    parser.add_argument("--movement-backend", choices=MOVEMENT_BACKENDS, default=MOVEMENT_BACKEND,
+                        help="Backend for the move planning and slot claims of simultaneous movement "
+                             "(numba is optional)")
+    parser.add_argument("--obstacle-map", metavar="PATH",
+                        help="Load the obstacles from an image (dark pixels) or a JSON list of [x, y, w, h]")
+    parser.add_argument("--world-size", metavar="WxH",
+                        help=f"Size of the world in pixels (default {WORLD_WIDTH}x{WORLD_HEIGHT})")
+    parser.add_argument("--chunks", metavar="XxY",
+                        help="Headless only: split the world into X by Y chunks (e.g. 2x2)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Worker processes for --chunks (0 steps the chunks in this process)")
+    parser.add_argument("--ensemble", type=int, metavar="K",
+                        help="Headless only: run K replicate worlds together and save their metrics")
+    parser.add_argument("--ensemble-out", default=ENSEMBLE_PATH, metavar="PATH",
+                        help="Where --ensemble saves the metrics array")
+    parser.add_argument("--control", metavar="ADDRESS",
+                        help="Serve the control/telemetry API on HOST:PORT (e.g. 127.0.0.1:8765) or a Unix socket path")
+    parser.add_argument("--metrics-every", type=int, default=CONTROL_METRICS_INTERVAL, metavar="N",
+                        help="Default ticks between metrics messages to --control subscribers")
+    parser.add_argument("--stop-on-extinction", action="store_true",
+                        help="Headless only: stop as soon as no cells are left")
+    parser.add_argument("--max-cells", type=int, metavar="N",
+                        help="Headless only: stop once the population reaches N cells")
+    parser.add_argument("--steady-window", type=int, nargs="?", const=STEADY_STATE_WINDOW, metavar="TICKS",
+                        help="Headless only: stop once cell and food counts are steady between two windows "
+                             f"of TICKS ticks (default {STEADY_STATE_WINDOW})")
+    parser.add_argument("--steady-tolerance", type=float, default=STEADY_STATE_TOLERANCE,
+                        help="Relative change still counted as steady")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    MOVEMENT_BACKEND = args.movement_backend
+    OBSTACLE_MAP = args.obstacle_map
+    if args.world_size:
+        WORLD_WIDTH, WORLD_HEIGHT = (int(n) for n in args.world_size.lower().split("x"))
+    config_watcher = None
+    if args.config:
+        config_watcher = ConfigWatcher(args.config)
+        apply_config(config_watcher.config)
+    seed = args.seed
+    if seed is None and args.record:
+        # A recording always has a known seed
+        seed = random.randrange(2 ** 32)
+    if seed is not None:
+        seed_simulation(seed)
+    snapshot_writer = None
+    if args.autosave_every > 0:
+        snapshot_writer = SnapshotWriter(args.snapshot_dir, args.autosave_every, args.keep_snapshots)
+    recorder = ReplayRecorder(args.record, seed, args.keyframe_every) if args.record else None
+    replay = Replay(args.replay) if args.replay else None
+    exporter = None
+    if args.export_trajectories:
+        exporter = TrajectoryExporter(args.export_trajectories, args.export_every, file_format=args.export_format)
+    run_options = dict(resume=args.resume, snapshot_writer=snapshot_writer,
+                       recorder=recorder, replay=replay, seek=args.seek, exporter=exporter,
+                       config_watcher=config_watcher,
+                       # A replay gets its decision periods from the recording
+                       scheduler=DecisionScheduler(args.tick_budget) if args.tick_budget and not replay else None)
+    control = ControlServer(args.control, args.metrics_every, args.snapshot_dir) if args.control else None
+    if control:
+        run_options["control"] = control
+    termination = None
+    if args.stop_on_extinction or args.max_cells or args.steady_window:
+        termination = TerminationCriteria(args.stop_on_extinction, args.max_cells, args.steady_window,
+                                          args.steady_tolerance)
+    try:
+        if args.ensemble:
+            run_ensemble(args.ticks, args.ensemble, seed if seed is not None else 0, args.ensemble_out)
+        elif args.chunks:
+            chunks_x, chunks_y = (int(n) for n in args.chunks.lower().split("x"))
+            run_chunked(args.ticks, chunks_x, chunks_y, args.workers, seed if seed is not None else 0,
+                        termination=termination)
+        elif args.headless:
+            run_headless(args.ticks, save=args.save, termination=termination, **run_options)
+        else:
+            main(**run_options)
+    finally:
+        if control:
+            control.close()
+        if snapshot_writer:
+            snapshot_writer.close()
+        if recorder:
+            recorder.close()
+        if exporter:
+            exporter.close()
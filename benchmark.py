@@ -0,0 +1,172 @@
+# benchmark.py
+#
+# Small benchmarks for Pixel Life. Run with:
+#   python benchmark.py memory [--count 100000]
+#   python benchmark.py ticks [--cells 1500] [--ticks 100]
+#   python benchmark.py backends [--cells 1500] [--ticks 100] [--seed 0]
+#   python benchmark.py checkpoint [--count 500000] [--seed 0]
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import Main
+from Main import Cell, Food, Obstacle
+
+
+def _dict_backed(cls):
+    """Build a copy of cls that stores its attributes in a regular __dict__."""
+    return type("Dict" + cls.__name__, (), {"__init__": cls.__init__})
+
+
+def measure_bytes_per_entity(factory, count):
+    """Return the average number of bytes allocated per object created by factory."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Don't count the list holding the objects
+    list_size = objects.__sizeof__()
+    del objects
+    return (after - before - list_size) / count
+
+
+def bench_memory(count):
+    entities = [
+        ("Cell", Cell, lambda cls, i: cls(i % 1400, i % 900)),
+        ("Food", Food, lambda cls, i: cls(i % 1400, i % 900, i)),
+        ("Obstacle", Obstacle, lambda cls, i: cls(i % 1400, i % 900, 20, 20)),
+    ]
+    print(f"{'Entity':<10}{'dict (B)':>12}{'slots (B)':>12}{'saved':>10}")
+    for name, cls, make in entities:
+        legacy = _dict_backed(cls)
+        dict_bytes = measure_bytes_per_entity(lambda i: make(legacy, i), count)
+        slot_bytes = measure_bytes_per_entity(lambda i: make(cls, i), count)
+        saved = 1 - slot_bytes / dict_bytes
+        print(f"{name:<10}{dict_bytes:>12.1f}{slot_bytes:>12.1f}{saved:>9.0%}")
+
+
+def fresh_world(seed):
+    """Reset the run state of Main and build a new seeded world."""
+    Main.seed_simulation(seed)
+    Main.reset_counters()
+    Main.next_cell_id = 0
+    for history in (Main.ticks, Main.live_cells_history, Main.food_cells_history, Main.highest_generation_history):
+        del history[:]
+    return Main.initial_world()
+
+
+def bench_ticks(num_cells, num_ticks, seed=0):
+    """Seconds per tick for each movement mode, on the same seeded world."""
+    Main.NUM_INITIAL_CELLS = num_cells
+    print(f"{'Movement':<14}{'ms/tick':>10}{'cells':>8}")
+    for movement in Main.MOVEMENTS:
+        Main.MOVEMENT = movement
+        cells, food_cells, obstacles, spatial_grid = fresh_world(seed)
+        start = time.perf_counter()
+        for _ in range(num_ticks):
+            current_tick = Main.record_history(cells, food_cells)
+            Main.step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        elapsed = time.perf_counter() - start
+        print(f"{movement:<14}{elapsed / num_ticks * 1000:>10.1f}{len(cells):>8}")
+
+
+def run_backend(backend, num_cells, num_ticks, seed):
+    """Run a seeded world with simultaneous movement on backend; return seconds for all but the first tick."""
+    Main.NUM_INITIAL_CELLS = num_cells
+    Main.MOVEMENT = "simultaneous"
+    Main.MOVEMENT_BACKEND = backend
+    cells, food_cells, obstacles, spatial_grid = fresh_world(seed)
+    Main.step_simulation(cells, food_cells, spatial_grid, obstacles, Main.record_history(cells, food_cells))
+    start = time.perf_counter()  # Not counting the first tick, which includes Numba compilation
+    for _ in range(num_ticks - 1):
+        current_tick = Main.record_history(cells, food_cells)
+        Main.step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+    return time.perf_counter() - start
+
+
+def bench_backends(num_cells, num_ticks, seed):
+    """Time the movement backends. tests/test_movement.py checks that they give the same run."""
+    for backend in Main.MOVEMENT_BACKENDS:
+        try:
+            elapsed = run_backend(backend, num_cells, num_ticks, seed)
+        except ImportError as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        print(f"{backend:<8}{elapsed / max(num_ticks - 1, 1) * 1000:>10.1f} ms/tick")
+
+
+def big_state(count, seed):
+    """A checkpoint state with count cells and count food: a small world repeated over and over."""
+    Main.NUM_INITIAL_CELLS = Main.NUM_INITIAL_FOOD = 100
+    state = Main.capture_state(*fresh_world(seed))
+    copies = -(-count // 100)
+    columns = ["cell_" + field for field in Main.CELL_ROW_FIELDS] + ["food_" + field for field in Main.FOOD_FIELDS]
+    for name in columns:
+        state[name] = np.concatenate([state[name]] * copies)[:count]
+    state["cell_id"] = np.arange(count)
+    state["cell_target"][:] = -1
+    state["cell_partner"][:] = -1
+    return state
+
+
+def bench_checkpoint(count, seed):
+    """Time saving and loading a checkpoint with count cells and count food."""
+    world = Main.restore_state(big_state(count, seed))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.npz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            Main.save_checkpoint(path, *world)
+            save_time = time.perf_counter() - start
+            start = time.perf_counter()
+            Main.load_checkpoint(path)
+            load_time = time.perf_counter() - start
+        size = os.path.getsize(path)
+    print(f"{count} cells + {count} food, {size / 2 ** 20:.1f} MiB")
+    for name, elapsed in (("save", save_time), ("load", load_time)):
+        print(f"{name:<6}{elapsed:>8.2f} s{elapsed / (2 * count) * 1e6:>8.2f} us/entity")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixel Life benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    memory_parser = subparsers.add_parser("memory", help="Bytes per entity, dict vs slots")
+    memory_parser.add_argument("--count", type=int, default=100000)
+
+    ticks_parser = subparsers.add_parser("ticks", help="Tick time per movement mode")
+    ticks_parser.add_argument("--cells", type=int, default=1500)
+    ticks_parser.add_argument("--ticks", type=int, default=100)
+
+    backends_parser = subparsers.add_parser("backends", help="Tick time per movement backend")
+    backends_parser.add_argument("--cells", type=int, default=1500)
+    backends_parser.add_argument("--ticks", type=int, default=100)
+    backends_parser.add_argument("--seed", type=int, default=0)
+
+    checkpoint_parser = subparsers.add_parser("checkpoint", help="Checkpoint save and load time")
+    checkpoint_parser.add_argument("--count", type=int, default=500000)
+    checkpoint_parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.benchmark == "memory":
+        bench_memory(args.count)
+    elif args.benchmark == "ticks":
+        bench_ticks(args.cells, args.ticks)
+    elif args.benchmark == "backends":
+        bench_backends(args.cells, args.ticks, args.seed)
+    elif args.benchmark == "checkpoint":
+        bench_checkpoint(args.count, args.seed)
+
+
+if __name__ == "__main__":
+    main()
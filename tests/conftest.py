@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Main  # noqa: E402
+
+# Module settings tests may change; they are put back after every test
+SETTINGS = ("NUM_INITIAL_CELLS", "NUM_INITIAL_FOOD", "MOVEMENT", "MOVEMENT_BACKEND", "WORLD_WIDTH", "WORLD_HEIGHT",
+            "OBSTACLE_MAP")
+
+
+@pytest.fixture
+def fresh_world(monkeypatch):
+    """Return a function that resets the run state of Main and builds a new seeded world."""
+    for name in SETTINGS:
+        monkeypatch.setattr(Main, name, getattr(Main, name))
+
+    def build(seed, **settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(Main, name, value)
+        Main.seed_simulation(seed)
+        Main.reset_counters()
+        Main.next_cell_id = 0
+        for history in (Main.ticks, Main.live_cells_history, Main.food_cells_history,
+                        Main.highest_generation_history):
+            del history[:]
+        return Main.initial_world()
+
+    return build
+
+
+@pytest.fixture
+def run_ticks():
+    """Return a function that steps a world from fresh_world for a number of ticks."""
+    def run(world, num_ticks):
+        cells, food_cells, obstacles, spatial_grid = world
+        for _ in range(num_ticks):
+            current_tick = Main.record_history(cells, food_cells)
+            Main.step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        return world
+
+    return run
+
@@ -0,0 +1,54 @@
+import numpy as np
+
+import Main
+
+
+def assert_states_equal(expected, actual):
+    assert expected.keys() == actual.keys()
+    for name in expected:
+        np.testing.assert_array_equal(actual[name], expected[name], err_msg=name)
+
+
+def test_run_continues_the_same_after_a_restore(fresh_world, run_ticks):
+    cells, food_cells, obstacles, spatial_grid = run_ticks(fresh_world(3, NUM_INITIAL_CELLS=150), 300)
+    saved = Main.capture_state(cells, food_cells, obstacles, spatial_grid)
+    assert (saved["cell_target"] >= 0).any()
+    expected = Main.capture_state(*run_ticks((cells, food_cells, obstacles, spatial_grid), 300))
+
+    restored = Main.restore_state(dict(saved))
+    assert_states_equal(saved, Main.capture_state(*restored))
+    assert_states_equal(expected, Main.capture_state(*run_ticks(restored, 300)))
+
+
+def test_frozen_state_is_not_affected_by_later_ticks(fresh_world, run_ticks):
+    world = run_ticks(fresh_world(3), 100)
+    expected = Main.capture_state(*world)
+    frozen = Main.freeze_state(*world)
+    run_ticks(world, 50)
+    assert_states_equal(expected, Main.complete_state(frozen))
+
+
+def tiled_state(state, copies):
+    """state with its cells and food repeated copies times, as a stand-in for a big world.
+    Targets and partners point into their own copy."""
+    state = dict(state)
+    cell_count, food_count = len(state["cell_id"]), len(state["food_x"])
+    columns = ["cell_" + field for field in Main.CELL_ROW_FIELDS] + ["food_" + field for field in Main.FOOD_FIELDS]
+    for name in columns:
+        state[name] = np.concatenate([state[name]] * copies)
+    state["cell_id"] = np.arange(len(state["cell_id"]))
+    copy = np.repeat(np.arange(copies), cell_count)
+    offset = np.where(state["cell_goal"] == Main.GOAL_FOOD, food_count, cell_count) * copy
+    state["cell_target"] = np.where(state["cell_target"] >= 0, state["cell_target"] + offset, -1)
+    state["cell_partner"] = np.where(state["cell_partner"] >= 0, state["cell_partner"] + cell_count * copy, -1)
+    return state
+
+
+def test_large_state_round_trips(fresh_world, run_ticks):
+    # Timing is in benchmark.py checkpoint; this checks the bulk paths keep every value
+    saved = Main.capture_state(*run_ticks(fresh_world(3, NUM_INITIAL_CELLS=150), 300))
+    state = tiled_state(saved, 300)
+    assert (state["cell_target"] >= 0).any() and (state["cell_partner"] >= 0).any()
+    cells, food_cells, obstacles, spatial_grid = Main.restore_state(dict(state))
+    assert len(cells) == 300 * len(saved["cell_id"])
+    assert_states_equal(state, Main.capture_state(cells, food_cells, obstacles, spatial_grid))
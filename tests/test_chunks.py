@@ -0,0 +1,34 @@
+import Main
+
+
+def run_chunked_world(workers, start_method=None, num_ticks=60):
+    Main.seed_simulation(1)
+    Main.next_cell_id = 0
+    cells, food_cells, obstacles = Main.new_world()
+    world = Main.ChunkedWorld(cells, food_cells, obstacles, 2, 2, workers, seed=0, start_method=start_method)
+    try:
+        for current_tick in range(1, num_ticks + 1):
+            world.step(current_tick)
+        cells, food_cells = world.gather()
+    finally:
+        world.close()
+    cells = sorted((cell.id, cell.x, cell.y, cell.hp, cell.hunger, cell.stamina, cell.age, cell.genome,
+                    cell.is_mating, cell.mating_timer, cell.partner.id if cell.partner else -1) for cell in cells)
+    return cells, sorted((food.x, food.y, food.spawn_tick) for food in food_cells)
+
+
+def test_spawned_workers_use_the_coordinators_settings(fresh_world, monkeypatch):
+    # Spawned workers start from a fresh import of Main, with the default world size and config
+    fresh_world(1, WORLD_WIDTH=3000, WORLD_HEIGHT=3000)
+    monkeypatch.setattr(Main, "MIN_FOOD_CELLS", Main.MIN_FOOD_CELLS + 40)
+    expected = run_chunked_world(workers=0)
+    assert expected[0]
+    assert run_chunked_world(workers=2, start_method="spawn") == expected
+
+
+def test_worker_count_does_not_change_the_run(fresh_world):
+    # Long enough for mating pairs to form at chunk borders and have children
+    fresh_world(1, NUM_INITIAL_CELLS=400)
+    expected = run_chunked_world(workers=0, num_ticks=300)
+    assert any(cell[0] >= Main.CHUNK_ID_SPACING for cell in expected[0])  # Born in a chunk
+    assert run_chunked_world(workers=2, num_ticks=300) == expected
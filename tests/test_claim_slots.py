@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+import Main
+
+
+def random_claims(seed, n, slot_count):
+    generator = np.random.default_rng(seed)
+    keys = generator.integers(0, slot_count, (n, 5))
+    valid = generator.random((n, 5)) < 0.8
+    stays = generator.random((n, 5)) < 0.1
+    priority = generator.random(n)
+    attempts = generator.integers(0, 6, n)
+    return keys, valid, stays, priority, attempts
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n, slot_count", [(10, 8), (500, 400), (3000, 20000)])
+def test_numba_claims_match_numpy(seed, n, slot_count):
+    pytest.importorskip("numba")
+    claims = random_claims(seed, n, slot_count)
+    expected = Main._claim_slots_numpy(*claims)
+    actual = Main.claim_slots_numba()(*claims, slot_count)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_claims_go_to_the_lowest_priority():
+    keys = np.array([[3, 4], [3, 5], [4, 6]])
+    valid = np.ones((3, 2), dtype=bool)
+    stays = np.zeros((3, 2), dtype=bool)
+    priority = np.array([0.5, 0.1, 0.9])
+    attempts = np.array([2, 2, 2])
+    # Cell 1 beats cell 0 to slot 3, and cell 0's second choice went to cell 2 in the first round
+    chosen = Main._claim_slots_numpy(keys, valid, stays, priority, attempts)
+    np.testing.assert_array_equal(chosen, [-1, 0, 0])
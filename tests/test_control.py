@@ -0,0 +1,43 @@
+import json
+import os
+import socket
+
+import pytest
+
+import Main
+
+
+@pytest.fixture
+def control(tmp_path):
+    server = Main.ControlServer(str(tmp_path / "control.sock"), snapshot_dir=str(tmp_path / "snapshots"))
+    client = socket.socket(socket.AF_UNIX)
+    client.connect(server.address)
+    lines = client.makefile("rw")
+
+    def send(**request):
+        lines.write(json.dumps(request) + "\n")
+        lines.flush()
+        return json.loads(lines.readline())
+
+    yield server, send
+    lines.close()
+    client.close()
+    server.close()
+
+
+@pytest.mark.parametrize("path", ["/tmp/elsewhere.npz", "../elsewhere.npz", "nested/../../elsewhere.npz", ""])
+def test_snapshots_outside_the_snapshot_dir_are_refused(control, path):
+    server, send = control
+    reply = send(command="snapshot", path=path)
+    assert not reply["ok"]
+    assert server.poll() == []
+
+
+def test_snapshots_go_into_the_snapshot_dir(control, tmp_path):
+    server, send = control
+    assert send(command="snapshot", path="nested/mine.npz")["ok"]
+    assert send(command="snapshot")["ok"]
+    assert [command["path"] for command in server.poll()] == [
+        os.path.join(tmp_path, "snapshots", "nested", "mine.npz"),
+        os.path.join(tmp_path, "snapshots", Main.CHECKPOINT_PATH),
+    ]
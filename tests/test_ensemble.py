@@ -0,0 +1,29 @@
+import numpy as np
+
+import Main
+
+
+def summary(cells, food_cells):
+    return (len(cells), len(food_cells), max((cell.generation for cell in cells), default=0))
+
+
+def test_single_replicate_matches_the_single_world_run(fresh_world):
+    seed = 7
+    world_seed = np.random.SeedSequence(seed).generate_state(1).tolist()[0]
+    cells, food_cells, obstacles, spatial_grid = fresh_world(world_seed, NUM_INITIAL_CELLS=150)
+    Main.seed_simulation(seed)  # EnsembleEngine runs on the ensemble seed once the worlds are built
+    expected = []
+    for _ in range(400):
+        current_tick = Main.record_history(cells, food_cells)
+        Main.step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        expected.append([summary(cells, food_cells)])
+    expected_cells = [(cell.id, cell.x, cell.y, cell.hp, cell.hunger) for cell in cells]
+
+    fresh_world(world_seed, NUM_INITIAL_CELLS=150)
+    Main.next_cell_id = 0
+    engine = Main.EnsembleEngine(1, seed)
+    replicate, replicate_food, _, _ = engine.worlds[0]
+    for _ in range(400):
+        engine.step(Main.record_history(replicate, replicate_food))
+    np.testing.assert_array_equal(engine.metrics_array(), np.array(expected))
+    assert [(cell.id, cell.x, cell.y, cell.hp, cell.hunger) for cell in replicate] == expected_cells
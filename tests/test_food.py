@@ -0,0 +1,21 @@
+import pytest
+
+import Main
+
+
+@pytest.mark.parametrize("minimum_over_maximum", [0, 1, 50])
+def test_expected_spawns_with_the_minimum_at_or_over_the_maximum(fresh_world, monkeypatch, minimum_over_maximum):
+    _, _, obstacles, _ = fresh_world(1)
+    monkeypatch.setattr(Main, "MIN_FOOD_CELLS", Main.MAX_FOOD_CELLS + minimum_over_maximum)
+    spawner = Main.FoodSpawner(obstacles)
+    assert spawner.expected_spawns(0) >= 1.0
+    assert spawner.expected_spawns(Main.MAX_FOOD_CELLS - 1) >= 1.0
+    assert spawner.expected_spawns(Main.MAX_FOOD_CELLS) == 0.0
+
+
+def test_expected_spawns_below_the_minimum(fresh_world, monkeypatch):
+    _, _, obstacles, _ = fresh_world(1)
+    monkeypatch.setattr(Main, "FOOD_RESPAWN_RATE", 0.01)
+    spawner = Main.FoodSpawner(obstacles)
+    assert spawner.expected_spawns(Main.MIN_FOOD_CELLS - 1) == 1.0
+    assert spawner.expected_spawns(Main.MIN_FOOD_CELLS) < 1.0
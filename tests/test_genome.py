@@ -0,0 +1,37 @@
+import numpy as np
+
+import Main
+
+
+def trait_column(values, name):
+    return values[:, Main.TRAIT_NAMES.index(name)]
+
+
+def test_children_are_clipped_at_inheritance(monkeypatch):
+    monkeypatch.setattr(Main, "rng", np.random.default_rng(0))
+    parents = np.zeros((5000, Main.GENOME_SIZE), dtype=np.int32)
+    parents[:, Main.TRAITS[Main.TRAIT_NAMES.index("max_hp")].gene] = 10
+    children = Main.express_genomes(Main.inherit_genomes(parents, parents))
+    # max(10, (10 + 10) // 2 + randint(-2, 2)), as in the original rules
+    assert set(trait_column(children, "max_hp").tolist()) == {10, 11, 12}
+    # speed: max(1, (0 + 0) // 2 + randint(-1, 1))
+    assert set(trait_column(children, "speed").tolist()) == {1}
+    metabolic_rate = trait_column(children, "metabolic_rate")
+    assert metabolic_rate.min() >= 0.5 and metabolic_rate.max() <= 2.0
+
+
+def test_founders_are_not_clipped(monkeypatch):
+    monkeypatch.setattr(Main, "rng", np.random.default_rng(0))
+    founders = Main.express_genomes(Main.founder_genomes(1000))
+    assert set(trait_column(founders, "max_hp").tolist()) == {-1, 0, 1}
+    assert set(trait_column(founders, "speed").tolist()) == {-1, 0, 1}
+
+
+def test_clipped_traits_ratchet_up(monkeypatch):
+    monkeypatch.setattr(Main, "rng", np.random.default_rng(0))
+    generator = np.random.default_rng(1)
+    genomes = Main.founder_genomes(1000)
+    for _ in range(20):
+        genomes = Main.inherit_genomes(genomes[generator.permutation(1000)], genomes[generator.permutation(1000)])
+    # The clipped gene is passed on, so the floor pushes the average up generation after generation
+    assert trait_column(Main.express_genomes(genomes), "max_hp").mean() > 11
@@ -0,0 +1,33 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import Main
+
+
+def test_simultaneous_movement_keeps_cells_apart(fresh_world):
+    # Mating and exhausted cells don't move, but their slots are still taken
+    cells, food_cells, obstacles, spatial_grid = fresh_world(5, NUM_INITIAL_CELLS=300, MOVEMENT="simultaneous")
+    dormant_seen = False
+    for _ in range(400):
+        current_tick = Main.record_history(cells, food_cells)
+        Main.step_simulation(cells, food_cells, spatial_grid, obstacles, current_tick)
+        dormant_seen |= any(cell.is_mating or cell.stamina < 0 for cell in cells)
+        shared = [slot for slot, count in Counter((cell.x, cell.y) for cell in cells).items() if count > 1]
+        assert not shared, f"cells share slots {shared} at tick {current_tick}"
+    assert dormant_seen
+
+
+def test_movement_backends_give_the_same_run(fresh_world, run_ticks):
+    pytest.importorskip("numba")
+    states = []
+    for backend in Main.MOVEMENT_BACKENDS:
+        world = fresh_world(5, NUM_INITIAL_CELLS=300, MOVEMENT="simultaneous", MOVEMENT_BACKEND=backend)
+        states.append(Main.capture_state(*run_ticks(world, 300)))
+    expected = states[0]
+    assert expected["cell_generation"].max() > 0  # Past the first births
+    for state in states[1:]:
+        assert state.keys() == expected.keys()
+        for name in expected:
+            np.testing.assert_array_equal(state[name], expected[name], err_msg=name)
@@ -0,0 +1,28 @@
+import Main
+
+
+def run_scheduler(scheduler, tick_ms, ticks):
+    """Feed scheduler ticks that take tick_ms(period) ms; returns the periods it went through."""
+    periods = [scheduler.period]
+    for _ in range(ticks):
+        event = scheduler.observe(tick_ms(scheduler.period))
+        if event is not None:
+            periods.append(event["value"])
+    return periods
+
+
+def test_period_adapts_to_the_budget_and_relaxes():
+    scheduler = Main.DecisionScheduler(budget_ms=20)
+    # Target searches dominate: spreading them over 4 ticks brings the tick to 17.5 ms
+    assert run_scheduler(scheduler, lambda period: 5 + 50 / period, 200) == [1, 2, 4]
+    # The load goes away, so the period goes back down one step at a time
+    assert run_scheduler(scheduler, lambda period: 2, 200) == [4, 3, 2, 1]
+
+
+def test_period_stops_rising_once_it_no_longer_helps():
+    scheduler = Main.DecisionScheduler(budget_ms=20)
+    # Movement dominates: 60 ms of work of which a period only spreads 8
+    periods = run_scheduler(scheduler, lambda period: 52 + 8 / period, 1000)
+    # 1 -> 2 saves 4 ms (7%), less than DECISION_MIN_GAIN, so it is undone and not tried again
+    assert periods == [1, 2, 1]
+    assert scheduler.period == 1
@@ -0,0 +1,59 @@
+import random
+
+import Main
+
+
+def make_cells(count, seed=0):
+    generator = random.Random(seed)
+    cells = [Main.Cell(generator.randrange(0, Main.WORLD_WIDTH, Main.CELL_SIZE),
+                       generator.randrange(0, Main.WORLD_HEIGHT, Main.CELL_SIZE)) for _ in range(count)]
+    for i, cell in enumerate(cells):
+        cell.id = i
+    return cells
+
+
+def test_get_nearby_is_the_same_for_every_bucket_size():
+    cells = make_cells(2000)
+    grids = [Main.build_spatial_grid(cells, cell_size=size) for size in Main.GRID_BUCKET_SIZES]
+    generator = random.Random(1)
+    for _ in range(200):
+        x = generator.randrange(0, Main.WORLD_WIDTH, Main.CELL_SIZE)
+        y = generator.randrange(0, Main.WORLD_HEIGHT, Main.CELL_SIZE)
+        for radius in (0, Main.CELL_SIZE, Main.GRID_CELL_SIZE, 55):
+            expected = [cell.id for cell in cells if abs(cell.x - x) <= radius and abs(cell.y - y) <= radius]
+            for grid in grids:
+                assert [cell.id for cell in grid.get_nearby(x, y, radius)] == expected
+
+
+def test_get_nearby_leaves_out_cells_beyond_the_radius():
+    far, near = make_cells(2)
+    far.x, far.y = 200, 100
+    near.x, near.y = 120, 100
+    for size in (10, 30, 120):
+        grid = Main.build_spatial_grid([far, near], cell_size=size)
+        assert grid.get_nearby(100, 100, 30) == [near]
+
+
+def test_mate_search_reach_does_not_depend_on_bucket_size():
+    seeker, mate = make_cells(2)
+    seeker.x, seeker.y = 100, 100
+    mate.y = 100  # Both positions below are in vision range, only the second within the search radius
+    for cell in (seeker, mate):
+        cell.hunger, cell.hp, cell.stamina, cell.mating_cooldown, cell.vision_range = 80, 90, 100, 0, 500
+    for mate_x, expected in ((100 + Main.GRID_CELL_SIZE * 2, None), (100 + Main.GRID_CELL_SIZE, mate)):
+        mate.x = mate_x
+        for size in Main.GRID_BUCKET_SIZES:
+            grid = Main.build_spatial_grid([seeker, mate], cell_size=size)
+            seeker.goal = Main.GOAL_NONE
+            assert seeker.current_target(Main.GOAL_MATE, [], grid) is expected
+
+
+def test_counts_follow_the_buckets(fresh_world, run_ticks):
+    # Moves, births and deaths, then a rebuild at every bucket size
+    cells, food_cells, obstacles, spatial_grid = run_ticks(fresh_world(2, NUM_INITIAL_CELLS=300), 600)
+    for size in (None,) + Main.GRID_BUCKET_SIZES:
+        if size is not None:
+            spatial_grid.rebuild(size)
+        expected = [[len(bucket) for bucket in column] for column in spatial_grid.grid]
+        assert spatial_grid.counts().tolist() == expected
+        assert spatial_grid.counts().sum() == len(cells)
@@ -0,0 +1,68 @@
+import queue
+import threading
+
+import numpy as np
+
+import Main
+
+
+def run_with_timeout(function, seconds=30):
+    """Run function on a thread; returns False if it is still blocked after seconds."""
+    thread = threading.Thread(target=function, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    return not thread.is_alive()
+
+
+def fail_once(monkeypatch, owner, name, error):
+    original = getattr(owner, name)
+    calls = []
+
+    def failing(*args, **kwargs):
+        calls.append(name)
+        if len(calls) == 1:
+            raise error
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(owner, name, failing)
+
+
+def test_snapshot_writer_survives_a_failed_snapshot(fresh_world, monkeypatch, tmp_path):
+    world = fresh_world(1)
+    fail_once(monkeypatch, Main, "complete_state", ValueError("broken state"))
+    writer = Main.SnapshotWriter(str(tmp_path), interval=1, keep=None)
+
+    def snapshot_twice():
+        writer.snapshot(1, *world)
+        writer.snapshot(2, *world)
+        writer.close()
+
+    assert run_with_timeout(snapshot_twice)
+    assert [Main.SnapshotWriter.snapshot_tick(path) for path in writer.list_snapshots(str(tmp_path))] == [2]
+
+
+def test_skipped_autosaves_do_not_freeze_the_world(fresh_world, monkeypatch, tmp_path):
+    world = fresh_world(1)
+    frozen = []
+    monkeypatch.setattr(Main, "freeze_state", lambda *args: frozen.append(args))
+    writer = Main.SnapshotWriter(str(tmp_path), interval=1)
+    idle_queue, writer.pending = writer.pending, queue.Queue(maxsize=1)
+    writer.pending.put((0, None))  # As if the writer were still busy with a snapshot
+    assert not writer.maybe_snapshot(1, *world)
+    assert frozen == []
+    writer.pending = idle_queue
+    writer.close()
+
+
+def test_trajectory_exporter_survives_a_failed_chunk(fresh_world, monkeypatch, tmp_path):
+    cells = fresh_world(1)[0]
+    fail_once(monkeypatch, np, "savez_compressed", ValueError("broken chunk"))
+    exporter = Main.TrajectoryExporter(str(tmp_path), interval=1, chunk_rows=1)
+
+    def export_past_the_queue_size():
+        for current_tick in range(1, 21):
+            exporter.maybe_export(current_tick, cells)
+        exporter.close()
+
+    assert run_with_timeout(export_past_the_queue_size)
+    assert len(list(tmp_path.iterdir())) == 19